@@ -1,28 +1,165 @@
-import asyncio
-from typing import Dict, List, Optional, Union, Sequence
+import hashlib
+import logging
+import weakref
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union, Sequence, TYPE_CHECKING
 
 from discord import Embed, Emoji, Forbidden, Message
-from discord import NotFound
 from discord.ext.commands import Context
 
+from discordmenu.embed.prerender import prerenderer
+from discordmenu.embed.snapshot import EmbedSnapshot
 from discordmenu.embed.view import EmbedView
 from discordmenu.embed.wrapper import EmbedWrapper
 from discordmenu.emoji.emoji_cache import emoji_cache
+from discordmenu.emoji.emoji_diff import diff_emoji_refs
+from discordmenu.menu_registry import menu_registry, MenuRegistry
+from discordmenu.reaction_queue import reaction_queue
+
+logger = logging.getLogger('discordmenu.discord_client')
+
+if TYPE_CHECKING:
+    from discordmenu.menu.listener.message_cache import MessageCache
+
+# caches of the listeners in this process, kept current with every message sent or edited here
+_message_caches: "weakref.WeakSet[MessageCache]" = weakref.WeakSet()
+
+# the singleton registry and those of the listeners in this process, each kept current with every menu sent here
+_menu_registries: "weakref.WeakSet[MenuRegistry]" = weakref.WeakSet([menu_registry])
+
+# what each message was last sent or edited with here: a fingerprint of its content, a snapshot of its embed, and
+# its edited_at at the time, so that a message edited elsewhere since isn't trusted to be unchanged
+MAX_EDIT_FINGERPRINTS = 10000
+_edit_fingerprints: "OrderedDict[int, Tuple[Optional[bytes], Optional[EmbedSnapshot], Optional[datetime]]]" = \
+    OrderedDict()
+
+# how many embed edits were sent or skipped, and how often each part of the embed changed in the ones sent
+embed_edit_stats: Dict[str, Any] = {
+    'edited': 0,
+    'skipped_unchanged': 0,
+    'skipped_by_policy': 0,
+    'changed_parts': Counter(),
+}
+
+# marks a part of the message that edit_message shouldn't touch
+UNCHANGED: Any = object()
+
+
+def track_messages(message_cache: "MessageCache") -> None:
+    """Store every message that discord-menu sends or edits from now on in `message_cache`."""
+    _message_caches.add(message_cache)
+
+
+def track_menus(registry: MenuRegistry) -> None:
+    """Record every menu that discord-menu sends or updates from now on in `registry`, as well as in `menu_registry`."""
+    _menu_registries.add(registry)
+
+
+def _record_menu(message_id: int) -> None:
+    for registry in _menu_registries:
+        registry.record(message_id)
+
+
+def _remember_message(message: Message) -> None:
+    for message_cache in _message_caches:
+        message_cache.put(message)
+
+
+def forget_message(message_id: int) -> None:
+    """Drop everything kept about a menu message that has been deleted."""
+    for registry in _menu_registries:
+        registry.discard(message_id)
+    reaction_queue.drop(message_id)
+    _edit_fingerprints.pop(message_id, None)
+    prerenderer.discard(message_id)
+    for message_cache in _message_caches:
+        message_cache.discard(message_id)
+
+
+def _fingerprint(value: Optional[str]) -> Optional[bytes]:
+    if not value:
+        return None
+    return hashlib.blake2b(value.encode(), digest_size=16).digest()
+
+
+def _snapshot(embed: Optional[Embed]) -> Optional[EmbedSnapshot]:
+    return EmbedSnapshot.of(embed) if embed is not None else None
+
+
+def _record_fingerprints(message: Message, content: Optional[bytes], embed: Optional[EmbedSnapshot]) -> None:
+    _edit_fingerprints[message.id] = (content, embed, message.edited_at)
+    _edit_fingerprints.move_to_end(message.id)
+    while len(_edit_fingerprints) > MAX_EDIT_FINGERPRINTS:
+        _edit_fingerprints.popitem(last=False)
+
+
+async def edit_message(message: Message, content: Optional[str] = UNCHANGED,
+                       embed: Optional[Embed] = UNCHANGED,
+                       should_edit: Optional[Callable[[Set[str]], bool]] = None) -> Message:
+    """
+    Edit a message's content and embed in a single request, sending only the parts that differ from what they
+    were last set to here. Nothing is sent if neither has changed. Returns the edited message.
+
+    `should_edit` is given the parts of the embed that changed (see EmbedSnapshot.changes) and can return False
+    to leave the embed as it is, e.g. `lambda changes: not is_state_only(changes)` when a stale state is
+    acceptable.
+    """
+    last_content, last_embed, edited_at = _edit_fingerprints.get(message.id, (None, None, None))
+    if message.id not in _edit_fingerprints or edited_at != message.edited_at:
+        # e.g. a message sent before a restart
+        last_content = _fingerprint(message.content)
+        last_embed = _snapshot(message.embeds[0]) if message.embeds else None
+    changes = {}
+    content_fingerprint, embed_snapshot = last_content, last_embed
+    if content is not UNCHANGED:
+        content_fingerprint = _fingerprint(content)
+        if content_fingerprint != last_content:
+            changes['content'] = content
+    if embed is not UNCHANGED:
+        embed_snapshot = _snapshot(embed)
+        changed_parts = _embed_changes(embed_snapshot, last_embed)
+        if not changed_parts:
+            embed_edit_stats['skipped_unchanged'] += 1
+        elif should_edit is not None and not should_edit(changed_parts):
+            embed_edit_stats['skipped_by_policy'] += 1
+            embed_snapshot = last_embed
+        else:
+            changes['embed'] = embed
+            embed_edit_stats['edited'] += 1
+            embed_edit_stats['changed_parts'].update(p.split(':')[0] for p in changed_parts)
+            logger.debug('Editing the embed of message %s, changed: %s', message.id, sorted(changed_parts))
+    if not changes:
+        return message
+
+    # discord.py returns the edited message as a new object rather than updating this one
+    message = await message.edit(**changes) or message
+    _record_fingerprints(message, content_fingerprint, embed_snapshot)
+    _remember_message(message)
+    return message
+
+
+def _embed_changes(snapshot: Optional[EmbedSnapshot], previous: Optional[EmbedSnapshot]) -> Set[str]:
+    if snapshot is None:
+        return {'embed'} if previous is not None else set()
+    if snapshot == previous:
+        return set()
+    return snapshot.changes(previous)
 
 
 async def update_message(message: Message, updated_messaged_contents, guild_message: bool,
-                         emoji_diff: Optional[Dict[str, List[Union[str, Emoji]]]] = None) -> None:
+                         emoji_diff: Optional[Dict[str, Any]] = None,
+                         embed: Optional[Embed] = UNCHANGED) -> Message:
+    """`embed` also replaces the message's embed, in the same edit, when the new contents are text."""
     if isinstance(updated_messaged_contents, Embed):
-        await message.edit(embed=updated_messaged_contents)
+        message = await edit_message(message, embed=updated_messaged_contents)
     else:
-        await message.edit(content=updated_messaged_contents)
+        message = await edit_message(message, content=updated_messaged_contents, embed=embed)
+    # the menu is still in use, which resets its ttl in the registry
+    _record_menu(message.id)
     if emoji_diff:
-        add = [message.add_reaction(e) for e in emoji_diff.get('add', [])]
-        await asyncio.gather(*add)
-
-        if guild_message:
-            remove = [message.clear_reaction(e) for e in emoji_diff.get('remove', [])]
-            await asyncio.gather(*remove)
+        await _schedule_emoji_diff(message, emoji_diff, guild_message)
+    return message
 
 
 async def remove_reaction(message: Message, emoji: str, user_id: int) -> None:
@@ -45,44 +182,48 @@ async def send_embed(ctx: Context, embed_wrapper: EmbedWrapper, message: Optiona
     new_embed = embed_wrapper.embed_view.to_embed()
     if message is None:
         message = await ctx.send(embed=new_embed)
+        _record_fingerprints(message, _fingerprint(message.content), _snapshot(new_embed))
+        _remember_message(message)
     else:
-        await message.edit(embed=new_embed)
+        message = await edit_message(message, embed=new_embed)
+    _record_menu(message.id)
 
     emoji_to_add = [emoji_cache.get_by_name(e) for e in embed_wrapper.emoji_buttons]
-    add = [message.add_reaction(e) for e in emoji_to_add]
-    try:
-        await asyncio.gather(*add)
-    except NotFound:
-        # if messsage is deleted early
-        pass
+    await reaction_queue.schedule(message, add=emoji_to_add)
     return message
 
 
 async def update_embed(message: Message, next_embed: EmbedWrapper,
-                       emoji_diff: Dict[str, List[Union[Emoji, str]]]) -> None:
+                       emoji_diff: Dict[str, Any],
+                       should_edit: Optional[Callable[[Set[str]], bool]] = None) -> Optional[Message]:
+    """
+    Returns the edited message, or None if the message was deleted because there is nothing left to show.
+    See edit_message for `should_edit`.
+    """
     guild_message = bool(message.guild)
 
     if not next_embed:
         await message.delete()
+        forget_message(message.id)
+        return None
 
-    updated_message_contents = next_embed.embed_view.to_embed()
-    await message.edit(embed=updated_message_contents)
+    # clicking the tab that is already showing gives the same embed, which isn't sent again
+    message = await edit_message(message, embed=next_embed.embed_view.to_embed(), should_edit=should_edit)
+    _record_menu(message.id)
 
     if emoji_diff:
-        add = [message.add_reaction(e) for e in emoji_diff.get('add', [])]
-        try:
-            await asyncio.gather(*add)
-        except NotFound:
-            # if messsage is deleted early
-            pass
-
-        if guild_message:
-            remove = [message.clear_reaction(e) for e in emoji_diff.get('remove', [])]
-            try:
-                await asyncio.gather(*remove)
-            except NotFound:
-                # if messsage is deleted early
-                pass
+        # deleted messages are dropped from the queue rather than raising NotFound
+        await _schedule_emoji_diff(message, emoji_diff, guild_message)
+    return message
+
+
+async def _schedule_emoji_diff(message: Message, emoji_diff: Dict[str, Any], guild_message: bool) -> None:
+    if not guild_message:
+        # reactions can't be cleared in DMs
+        await reaction_queue.schedule(message, add=emoji_diff.get('add', []))
+        return
+    await reaction_queue.schedule(message, add=emoji_diff.get('add', []), remove=emoji_diff.get('remove', []),
+                                  remove_first=not emoji_diff.get('order_preserved', True))
 
 
 def diff_emojis(message: Message, next_embed: EmbedWrapper) -> Dict[str, List[Union[str, Emoji]]]:
@@ -91,15 +232,17 @@ def diff_emojis(message: Message, next_embed: EmbedWrapper) -> Dict[str, List[Un
     return diff_emojis_raw(current_emojis, next_emojis)
 
 
-def diff_emojis_raw(current_emojis: List[Union[str, Emoji]], next_emojis: List[Union[str, Emoji]]) \
-        -> Dict[str, List[Union[str, Emoji]]]:
-    add = sorted(
-        set(e for e in next_emojis if e and not emoji_matches(e, current_emojis)),
-        key=lambda x: next_emojis.index(x))
-    remove = list(set(e for e in current_emojis if e and not emoji_matches(e, next_emojis)))
+def diff_emojis_raw(current_emojis: List[Union[str, Emoji]], next_emojis: List[Union[str, Emoji]],
+                    reorder: bool = False) -> Dict[str, Any]:
+    """
+    With `reorder`, buttons that would end up out of order are cleared and added again, see diff_emoji_refs.
+    `order_preserved` is False in the result when that is the case, and the removes must then be applied first.
+    """
+    emoji_diff = diff_emoji_refs(current_emojis, next_emojis, reorder=reorder)
     return {
-        'add': [emoji_cache.get_by_name(e) for e in add],
-        'remove': remove,
+        'add': [emoji_cache.get_by_name(e) for e in emoji_diff.add],
+        'remove': emoji_diff.remove,
+        'order_preserved': emoji_diff.order_preserved,
     }
 
 
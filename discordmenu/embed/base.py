@@ -1,21 +1,193 @@
 from abc import abstractmethod, ABC
-from typing import List, Mapping, Union, Iterable, Any
+from typing import List, Mapping, Union, Iterable, Any, Optional, Dict
+
+# bumped whenever any box changes after construction, so that a cached render checked since then is known to be
+# current without checking the boxes under it again
+_markdown_epoch = 0
 
 
 class Box:
+    """
+    Boxes render by writing fragments into a MarkdownWriter, so a whole tree is joined into a string once.
+    Each box in the tree caches its own markdown, along with the cached markdown of the boxes it contains,
+    so that a cached render is reused only while none of the boxes under it has been changed through its
+    property setters, and a changed box only renders its own subtree again. Subclasses should implement
+    `_write_markdown`, and call `invalidate_markdown` whenever state it writes changes after construction,
+    as should code that modifies a box's list of children in place.
+    """
+    _markdown: Optional[str] = None
+    # each child box followed by the child's markdown that this box's markdown was written with, flattened so
+    # that rendering a tree allocates as little as possible
+    _markdown_children: Optional[List[Union["Box", str]]] = None
+    _markdown_checked = -1
+
     def __init__(self, *args: Union[str, "Box"], delimiter: str = "\n"):
+        # set up front so that every box keeps a compact attribute dict
+        self._markdown = None
+        self._markdown_children = None
+        self._markdown_checked = -1
         self._inner_object = [a for a in args if a]
-        self.delimiter = delimiter
+        self._delimiter = delimiter
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state.pop('_markdown', None)
+        state.pop('_markdown_children', None)
+        state.pop('_markdown_checked', None)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+
+    @property
+    def delimiter(self) -> str:
+        return self._delimiter
+
+    @delimiter.setter
+    def delimiter(self, delimiter: str) -> None:
+        self._delimiter = delimiter
+        self.invalidate_markdown()
+
+    def invalidate_markdown(self) -> None:
+        # the boxes containing this one notice when they check their children's markdown
+        global _markdown_epoch
+        _markdown_epoch += 1
+        self._markdown = None
+        self._markdown_children = None
+
+    def _markdown_is_current(self) -> bool:
+        if self._markdown is None:
+            return False
+        if self._markdown_checked == _markdown_epoch:
+            return True
+        children = self._markdown_children
+        if children is not None:
+            for i in range(0, len(children), 2):
+                child = children[i]
+                if child._markdown is not children[i + 1] or not child._markdown_is_current():
+                    return False
+        self._markdown_checked = _markdown_epoch
+        return True
 
     def _get_markdown(self, arg: Union[str, "Box"]) -> str:
         if hasattr(arg, 'to_markdown'):
             return arg.to_markdown()
         return arg
 
-    def to_markdown(self) -> str:
-        if len(self._inner_object) == 1:
-            return self._get_markdown(self._inner_object[0])
-        return self.delimiter.join([self._get_markdown(a) for a in self._inner_object])
+    def to_markdown(self, limit: Optional[int] = None) -> str:
+        """Render the box, stopping once `limit` characters have been written if one is given."""
+        if self._markdown_is_current():
+            markdown = self._markdown
+            return markdown if limit is None else markdown[:limit]
+
+        writer = MarkdownWriter(limit)
+        writer.render_box(self)
+        return writer.getvalue()
+
+    def _write_markdown(self, writer: "MarkdownWriter") -> None:
+        delimiter = self._delimiter
+        for i, item in enumerate(self._inner_object):
+            if i:
+                writer.write(delimiter)
+            if type(item) is str:
+                writer.write(item)
+            else:
+                writer.write_markdown(item)
+            if writer.full:
+                return
+
+
+class MarkdownWriter:
+    """
+    Collects the markdown of a tree of boxes as a list of fragments that is joined once at the end.
+    With a `limit`, writing stops once that many characters have been written. Values that aren't strings or
+    boxes are written as `str(value)`, and None as nothing.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self.length = 0
+        self.full = False
+        self.truncated = False
+        # False once something that doesn't tell us when it changes has been written in the current box, e.g. a
+        # box that overrides to_markdown
+        self.cacheable = True
+        self._fragments: List[str] = []
+        # the boxes written directly into the current box, see Box._markdown_children
+        self._children: Optional[List[Union[Box, str]]] = None
+        if limit is None:
+            # nothing to count, so skip the method call for every fragment
+            self.write = self._fragments.append
+
+    def write(self, markdown: str) -> None:
+        if self.full:
+            self.truncated = self.truncated or bool(markdown)
+            return
+        self._fragments.append(markdown)
+        self.length += len(markdown)
+        if self.length >= self.limit:
+            self.full = True
+            self.truncated = self.length > self.limit
+
+    def write_markdown(self, item: Any) -> None:
+        if isinstance(item, Box):
+            self.write_box(item)
+        elif isinstance(item, str):
+            self.write(item)
+        elif hasattr(item, 'to_markdown'):
+            self.cacheable = False
+            self.write(item.to_markdown())
+        elif item is not None:
+            self.write(str(item))
+
+    def write_box(self, box: Box) -> None:
+        if self.full:
+            self.truncated = True
+            return
+        markdown = box._markdown
+        if type(box).to_markdown is not Box.to_markdown:
+            self.cacheable = False
+            self.write(box.to_markdown())
+        elif markdown is not None and (box._markdown_checked == _markdown_epoch or box._markdown_is_current()):
+            self.write(markdown)
+            self._add_child(box, markdown)
+        else:
+            self.render_box(box)
+
+    def render_box(self, box: Box) -> None:
+        """Write `box` without looking at its cached markdown, and cache what it writes if nothing was cut off."""
+        fragments = self._fragments
+        start = len(fragments)
+        children, cacheable = self._children, self.cacheable
+        self._children, self.cacheable = None, True
+        box._write_markdown(self)
+        box_children = self._children
+        self._children = children
+        if not self.cacheable or self.truncated:
+            self.cacheable = False
+            return
+        self.cacheable = cacheable
+        if len(fragments) - start == 1:
+            markdown = fragments[start]
+        else:
+            # the box's fragments are replaced by its markdown, so the boxes containing it join one string
+            markdown = ''.join(fragments[start:])
+            del fragments[start:]
+            fragments.append(markdown)
+        box._markdown = markdown
+        box._markdown_children = box_children
+        box._markdown_checked = _markdown_epoch
+        self._add_child(box, markdown)
+
+    def _add_child(self, box: Box, markdown: str) -> None:
+        if self._children is None:
+            self._children = [box, markdown]
+        else:
+            self._children += (box, markdown)
+
+    def getvalue(self) -> str:
+        markdown = ''.join(self._fragments)
+        return markdown if self.limit is None else markdown[:self.limit]
 
 
 class CustomMapping(Mapping[str, Any], ABC):
@@ -6,14 +6,29 @@ from discordmenu.embed.base import CustomMapping, Box
 from discordmenu.embed.text import Text
 
 
+class ChunkOverflow:
+    """
+    What EmbedView does with a line of a field that is longer than a field value can hold.
+    """
+    # raise an EmbedChunkError
+    ERROR = 'error'
+    # split the line at the field value limit
+    HARD_WRAP = 'hard_wrap'
+    # split the line at the last space that fits, or at the limit if there is none
+    WORD_WRAP = 'word_wrap'
+    # cut the line short with an ellipsis and drop the rest of it
+    TRUNCATE = 'truncate'
+
+
 class EmbedField(CustomMapping):
     @property
     def fields(self) -> List[str]:
         return ["name", "value", "inline"]
 
     def __init__(self, title: Union[Box, str], body: Union[Box, str], inline: bool = False,
-                 chunk_delimiter: str = '\n', continuation_title: str = ''):
+                 chunk_delimiter: str = '\n', continuation_title: str = '', overflow: str = ChunkOverflow.ERROR):
         self.continuation_title = continuation_title
+        self.overflow = overflow
         self.chunk_delimiter = chunk_delimiter
         self._name = Text(title)
         self._value = body
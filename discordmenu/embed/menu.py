@@ -1,19 +1,22 @@
 import asyncio
-from typing import Callable, List, Dict
+import inspect
+from typing import Callable, Collection, List, Dict, Optional, Sequence, Tuple, Union
 
 import discord
 from discord import Message, RawReactionActionEvent, Member, Reaction
 from discord.ext.commands import Context
 
 from discordmenu.discord_client import remove_reaction, update_embed, send_embed, \
-    diff_emojis_raw
+    diff_emojis_raw, forget_message
+from discordmenu.embed.prerender import prerenderer
 from discordmenu.embed.transitions import EmojiRef, TransitionEmbedFunc, DEFAULT_TRANSITIONS, \
     EmbedMenuDefaultTransitions
 from discordmenu.embed.view_state import ViewState
 from discordmenu.embed.wrapper import EmbedWrapper
 from discordmenu.emoji.emoji import discord_emoji_to_emoji_name
-from discordmenu.intra_message_state import _IntraMessageState
-from discordmenu.reaction_filter import ReactionFilter
+from discordmenu.intra_message_state import _IntraMessageState, IntraMessageState, ImsView
+from discordmenu.reaction_queue import reaction_queue
+from discordmenu.reaction_filter import ReactionFilter, ReactionFilterPipeline
 
 
 class EmbedMenu:
@@ -22,14 +25,23 @@ class EmbedMenu:
                  initial_pane: Callable,
                  default_transitions: EmbedMenuDefaultTransitions = DEFAULT_TRANSITIONS,
                  unsupported_transition_announce_timeout: int = 3,
+                 prerender_emojis: Collection[str] = (),
+                 reorder_reactions: bool = False,
                  ):
         self.default_transitions = default_transitions
         self.transitions = transitions
         self.initial_pane = initial_pane
         self.unsupported_transition_announce_timeout = unsupported_transition_announce_timeout
+        # buttons whose panes are built in the background after each transition, see Prerenderer. Their
+        # transitions must be foldable: they are run ahead of a click that may never come.
+        self.prerender_emojis = prerender_emojis
+        # clear and add the reactions again when a transition would leave the buttons out of order
+        self.reorder_reactions = reorder_reactions
 
     async def create(self, ctx: Context, state: ViewState, message: Message = None) -> Message:
         embed_wrapper: EmbedWrapper = self.initial_pane(state)
+        if inspect.isawaitable(embed_wrapper):
+            embed_wrapper = await embed_wrapper
         e_buttons = embed_wrapper.emoji_buttons
 
         # Only add the close button if it doesn't exist, in case user has overridden it.
@@ -38,7 +50,8 @@ class EmbedMenu:
         return await send_embed(ctx, embed_wrapper, message=message)
 
     async def transition(self, message: Message, ims: _IntraMessageState, emoji_clicked: str, member: Member, **data) \
-            -> None:
+            -> Optional[EmbedWrapper]:
+        """Run the transition for a click and edit the message, returning what the message now shows, if changed."""
         transition_func = self.transitions.get(emoji_clicked)
         new_control = None
         delete_emoji_ref = discord_emoji_to_emoji_name(self.default_transitions.delete_message.emoji_ref)
@@ -48,6 +61,7 @@ class EmbedMenu:
             if emoji_clicked == delete_emoji_ref:
                 if self.default_transitions.delete_message.transition_func is None:
                     await message.delete()
+                    forget_message(message.id)
                 else:
                     new_control = await self.default_transitions.delete_message.transition_func(message, ims, **data)
                     try:
@@ -59,39 +73,89 @@ class EmbedMenu:
                         # but we might fail to do so
                         pass
             if new_control is None:
-                return
+                return None
         else:
-            new_control = await transition_func(message, ims, **data)
+            new_control = await self._run_transition(transition_func, message, ims, emoji_clicked, data)
         if new_control is not None:
             current_emojis = [e.emoji for e in message.reactions]
             next_emojis = [self.default_transitions.delete_message.emoji_ref] + new_control.emoji_buttons
 
-            emoji_diff = diff_emojis_raw(current_emojis, next_emojis)
+            emoji_diff = diff_emojis_raw(current_emojis, next_emojis, reorder=self.reorder_reactions)
             await update_embed(message, new_control, emoji_diff)
+            self._prerender(message, new_control, data)
         elif self.default_transitions.unsupported_transition.transition_func is not None:
             # allow the reporting of an unsupported transition to be nulled by config
-            await message.add_reaction(self.default_transitions.unsupported_transition.emoji_ref)
+            await reaction_queue.schedule(message, add=[self.default_transitions.unsupported_transition.emoji_ref],
+                                          supersede=False)
             asyncio.create_task(self.remove_unsupported_action_response(message))
 
         if message.guild:
             await remove_reaction(message, emoji_clicked, member.id)
+        return new_control
+
+    async def transition_folded(self, message: Message, ims: _IntraMessageState,
+                                clicks: Sequence[Tuple[str, Member]], **data) -> Optional[EmbedWrapper]:
+        """
+        Apply several clicks of foldable transitions in order, carrying the state between them in memory,
+        and edit the message once with the result.
+        """
+        new_control = None
+        for emoji_clicked, _ in clicks:
+            transition_func = self.transitions.get(emoji_clicked)
+            if transition_func is None:
+                break
+            data['reaction'] = emoji_clicked
+            next_control = await self._run_transition(transition_func, message, ims, emoji_clicked, data)
+            if next_control is None:
+                break
+            new_control = next_control
+            ims = await IntraMessageState.resolve(new_control.extract_ims())
+
+        if new_control is not None:
+            current_emojis = [e.emoji for e in message.reactions]
+            next_emojis = [self.default_transitions.delete_message.emoji_ref] + new_control.emoji_buttons
+            await update_embed(message, new_control,
+                               diff_emojis_raw(current_emojis, next_emojis, reorder=self.reorder_reactions))
+            self._prerender(message, new_control, data)
+
+        if message.guild:
+            # in public channels a second click on a reaction we haven't removed yet is ignored, so only
+            # clear each user's reaction once
+            for emoji_clicked, member_id in dict.fromkeys((e, m.id) for e, m in clicks):
+                await remove_reaction(message, emoji_clicked, member_id)
+        return new_control
+
+    async def _run_transition(self, transition_func: TransitionEmbedFunc, message: Message, ims: _IntraMessageState,
+                              emoji_clicked: str, data: dict) -> Optional[EmbedWrapper]:
+        if emoji_clicked in self.prerender_emojis:
+            new_control = await prerenderer.take(message.id, ims, emoji_clicked)
+            if new_control is not None:
+                return new_control
+        return await transition_func(message, ims, **data)
+
+    def _prerender(self, message: Message, new_control: EmbedWrapper, data: dict) -> None:
+        emojis = [e for e in new_control.emoji_buttons if e in self.prerender_emojis and e in self.transitions]
+        if not emojis:
+            return
+
+        async def schedule():
+            ims = await IntraMessageState.resolve(new_control.extract_ims())
+            if ims:
+                prerenderer.schedule(message.id, ims, emojis, lambda emoji: self.transitions[emoji](
+                    message, ImsView(ims), **dict(data, reaction=emoji)))
+
+        asyncio.create_task(schedule())
 
     async def remove_unsupported_action_response(self, message: Message) -> None:
         await asyncio.sleep(self.unsupported_transition_announce_timeout)
-        await message.clear_reaction(self.default_transitions.unsupported_transition.emoji_ref)
+        await reaction_queue.schedule(message, remove=[self.default_transitions.unsupported_transition.emoji_ref],
+                                      supersede=False)
 
     async def should_respond_raw(self, message: Message, event: RawReactionActionEvent,
-                                 reaction_filters: List[ReactionFilter]) -> bool:
-        for reaction_filter in reaction_filters:
-            allow = await reaction_filter.allow_reaction_raw(message, event)
-            if not allow:
-                return False
-        return True
-
-    async def should_respond(self, message: Message, reaction: Reaction, reaction_filters: List[ReactionFilter],
+                                 reaction_filters: Union[List[ReactionFilter], ReactionFilterPipeline]) -> bool:
+        return await ReactionFilterPipeline.of(reaction_filters).allow_reaction_raw(message, event)
+
+    async def should_respond(self, message: Message, reaction: Reaction,
+                             reaction_filters: Union[List[ReactionFilter], ReactionFilterPipeline],
                              member: Member) -> bool:
-        for reaction_filter in reaction_filters:
-            allow = await reaction_filter.allow_reaction(message, reaction, member)
-            if not allow:
-                return False
-        return True
+        return await ReactionFilterPipeline.of(reaction_filters).allow_reaction(message, reaction, member)
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from discordmenu.embed.view import EmbedView
+from discordmenu.embed.view_cache import view_cache, PrerenderedView, _cache_embed
+from discordmenu.embed.view_state import ViewState
+from discordmenu.intra_message_state import IntraMessageState
+
+logger = logging.getLogger('discordmenu.offload')
+
+V = TypeVar('V', bound=Callable[[ViewState], EmbedView])
+
+
+def offloadable(view_fn: V) -> V:
+    """Mark a view class or function as safe to build off the event loop, see ViewOffloader."""
+    view_fn.OFFLOADABLE = True
+    return view_fn
+
+
+def is_offloadable(view_fn: Callable[[ViewState], EmbedView]) -> bool:
+    return getattr(view_fn, 'OFFLOADABLE', False)
+
+
+def _build_embed(view_fn: Callable[[ViewState], EmbedView], state: ViewState) -> Dict[str, Any]:
+    # the store is only used on the event loop, where the IMS is serialized again
+    with IntraMessageState.without_store():
+        return view_fn(state).to_embed().to_dict()
+
+
+class ViewOffloader:
+    """
+    Builds and renders views marked `offloadable` in an executor, so that views that take a while to build don't
+    hold up the event loop. At most `max_concurrency` views are built at a time, and waiting for a view longer than
+    `timeout` seconds raises asyncio.TimeoutError; the build itself can't be stopped, and keeps its slot until it
+    finishes.
+
+    With a ProcessPoolExecutor, the view and its state are pickled to the worker, so both have to be importable
+    at module level, and the view can't depend on anything the bot set up at runtime. Without an executor, views
+    are built on the event loop.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None, max_concurrency: int = 4,
+                 timeout: Optional[float] = 10):
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.offloaded = 0
+        self.timeouts = 0
+        self._running = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def configure(self, executor: Optional[Executor], max_concurrency: Optional[int] = None,
+                  timeout: Optional[float] = None) -> None:
+        self.executor = executor
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+            self._semaphore = None
+        if timeout is not None:
+            self.timeout = timeout
+
+    async def render(self, view_fn: Callable[[ViewState], EmbedView], state: ViewState) -> EmbedView:
+        """`view_fn(state)`, built in the executor if the view is offloadable, and from the view cache if cached."""
+        if self.executor is None or not is_offloadable(view_fn):
+            return view_cache.render(view_fn, state)
+        view = view_cache.get(view_fn, state)
+        if view is not None:
+            return view
+
+        embed_data = await self._run(_build_embed, view_fn, state)
+        self.offloaded += 1
+        view = view_cache.put(view_fn, state, embed_data)
+        if view is None:
+            # the worker serialized the IMS without the store, so it's serialized again like a cached view
+            view = PrerenderedView(_cache_embed(embed_data), state.serialize())
+        return view
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'offloaded': self.offloaded,
+            'timeouts': self.timeouts,
+            'running': self._running,
+        }
+
+    async def _run(self, func: Callable, *args) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        semaphore = self._semaphore
+        await semaphore.acquire()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        except BaseException:
+            semaphore.release()
+            raise
+        self._running += 1
+        future.add_done_callback(lambda f: self._done(semaphore, f))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning('Building a view took longer than %s seconds', self.timeout)
+            raise
+
+    def _done(self, semaphore: asyncio.Semaphore, future: asyncio.Future) -> None:
+        self._running -= 1
+        semaphore.release()
+        if not future.cancelled() and future.exception() is not None:
+            # also raised to the caller, unless it has timed out
+            logger.debug('Building a view failed', exc_info=future.exception())
+
+
+view_offloader = ViewOffloader()
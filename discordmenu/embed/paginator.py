@@ -0,0 +1,183 @@
+from copy import copy
+from functools import partial
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from discordmenu.embed.base import Box
+from discordmenu.embed.components import EmbedField, EmbedFooter, ChunkOverflow
+from discordmenu.embed.view import EmbedView, EmbedChunkError, DroppedContent, HIDDEN_CHAR, FIELD_VALUE_LIMIT, \
+    MAX_FIELDS, EMBED_TOTAL_LIMIT, DROPPED_TRUNCATED, _get_field_markdown, _next_chunk
+from discordmenu.embed.view_state import ViewState
+
+DESCRIPTION_LIMIT = 4096
+# room left for a footer built per page, which isn't known when the pages are laid out
+DEFAULT_FOOTER_RESERVE = 64
+
+# where a page starts: the index of a part of the view (0 is the description, then one per field) and an
+# offset into that part's markdown
+_Cursor = Tuple[int, int]
+
+
+class _Page:
+    def __init__(self):
+        self.description = ''
+        self.fields: List[EmbedField] = []
+
+
+class EmbedPaginator(Sequence[Callable[[Optional[ViewState]], EmbedView]]):
+    """
+    Splits an EmbedView that doesn't fit in one embed into pages that each do. The description is split at
+    newlines and the fields at their chunk delimiters, as EmbedView.to_embed does, and pages are filled until
+    the next chunk would take them past `max_length` characters or `max_fields` fields.
+
+    Pages are laid out in order as they are asked for, and only where each page starts is kept, so a page's view
+    is built only when that page is shown. The page count needs the whole view to be laid out once.
+    Indexing a paginator gives a function from a view state to the page's view, so it can be set as the views of
+    a ScrollableMenu; `footer` builds the footer of each page from that state.
+    """
+
+    def __init__(self, view: EmbedView,
+                 footer: Optional[Callable[[ViewState], EmbedFooter]] = None,
+                 max_length: int = EMBED_TOTAL_LIMIT,
+                 max_fields: int = MAX_FIELDS,
+                 description_limit: int = DESCRIPTION_LIMIT,
+                 field_limit: int = FIELD_VALUE_LIMIT,
+                 footer_reserve: int = DEFAULT_FOOTER_RESERVE):
+        self.view = view
+        self.footer = footer
+        self.max_fields = max_fields
+        self.description_limit = description_limit
+        self.field_limit = field_limit
+        self.dropped_content: List[DroppedContent] = []
+
+        main = view.embed_main
+        fixed_length = len(main.title or '')
+        if view.embed_author is not None:
+            fixed_length += len(view.embed_author.name or '')
+        if footer is not None:
+            fixed_length += footer_reserve
+        elif view.embed_footer is not None:
+            fixed_length += len(view.embed_footer['text'] or '')
+        self.page_length = max_length - fixed_length
+
+        self._markdown: List[Optional[str]] = [None] * (len(view.embed_fields) + 1)
+        self._starts: List[_Cursor] = [self._skip_empty((0, 0))]
+        self._laid_out = self._at_end(self._starts[0])
+
+    def __len__(self) -> int:
+        while not self._laid_out:
+            self._layout_next()
+        # the last start is the end of the view; an empty view still has one, empty, page
+        return max(len(self._starts) - 1, 1)
+
+    def __getitem__(self, idx: int) -> Callable[[Optional[ViewState]], EmbedView]:
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or not self._has_page(idx):
+            raise IndexError('page index out of range')
+        return partial(self.page, idx)
+
+    def page(self, idx: int, state: Optional[ViewState] = None) -> EmbedView:
+        if not self._has_page(idx):
+            raise IndexError('page index out of range')
+        page, _ = self._layout(self._starts[idx])
+        view = self.view
+        main = copy(view.embed_main)
+        main.description = page.description
+        if self.footer is None:
+            footer = view.embed_footer
+        else:
+            # without a state there's nothing to build the page's footer from
+            footer = self.footer(state) if state is not None else None
+        return EmbedView(main,
+                         embed_author=view.embed_author,
+                         embed_thumbnail=view.embed_thumbnail,
+                         embed_body_image=view.embed_body_image,
+                         embed_fields=page.fields,
+                         embed_footer=footer)
+
+    def _has_page(self, idx: int) -> bool:
+        while len(self._starts) <= idx and not self._laid_out:
+            self._layout_next()
+        return idx < len(self._starts) and (idx == 0 or not self._at_end(self._starts[idx]))
+
+    def _layout_next(self) -> None:
+        start = self._starts[-1]
+        _, next_start = self._layout(start, record=True)
+        if next_start == start:
+            raise EmbedChunkError("Could not fit any content on a page")
+        self._starts.append(next_start)
+        self._laid_out = self._at_end(next_start)
+
+    def _layout(self, start: _Cursor, record: bool = False) -> Tuple[_Page, _Cursor]:
+        """Fill a page from `start`, returning it and where the next page starts."""
+        page = _Page()
+        remaining = self.page_length
+        part, pos = start
+        if part == 0:
+            description = self._get_markdown(0)
+            limit = min(self.description_limit, remaining)
+            if len(description) - pos <= limit:
+                page.description, pos = description[pos:], len(description)
+            else:
+                page.description, pos, _ = _next_chunk(description, pos, limit, '\n', ChunkOverflow.HARD_WRAP)
+            remaining -= len(page.description)
+            if pos < len(description):
+                return page, (0, pos)
+            part, pos = self._skip_empty((1, 0))
+
+        fields = self.view.embed_fields
+        last_part = None
+        while part <= len(fields) and len(page.fields) < self.max_fields:
+            field = fields[part - 1]
+            markdown = self._get_markdown(part)
+            if pos == 0:
+                name = field.name.value
+            elif part != last_part:
+                # the first chunk of a field that carries on from the last page
+                name = field.continuation_title or field.name.value
+            else:
+                name = field.continuation_title or HIDDEN_CHAR
+            name_length = len(name.to_markdown() if isinstance(name, Box) else name)
+            size = min(self.field_limit, remaining - name_length)
+            if size <= 0:
+                break
+
+            if len(markdown) - pos <= size:
+                body, next_pos = markdown[pos:], len(markdown)
+            elif (size < self.field_limit and (page.fields or page.description)
+                  and markdown.rfind(field.chunk_delimiter, pos, pos + size) == -1):
+                # the line may fit in a whole field on the next page
+                break
+            else:
+                body, next_pos, truncated = _next_chunk(markdown, pos, size, field.chunk_delimiter, field.overflow)
+                if truncated and record:
+                    self.dropped_content.append(
+                        DroppedContent(field.name.to_markdown(), truncated, DROPPED_TRUNCATED))
+
+            if body:
+                page.fields.append(EmbedField(name, body, field.inline))
+                last_part = part
+                remaining -= name_length + len(body)
+            part, pos = self._skip_empty((part, next_pos))
+        return page, (part, pos)
+
+    def _get_markdown(self, part: int) -> str:
+        markdown = self._markdown[part]
+        if markdown is None:
+            if part == 0:
+                description = self.view.embed_main.description
+                markdown = description.to_markdown() if isinstance(description, Box) else description or ''
+            else:
+                markdown = _get_field_markdown(self.view.embed_fields[part - 1])
+            self._markdown[part] = markdown
+        return markdown
+
+    def _skip_empty(self, cursor: _Cursor) -> _Cursor:
+        part, pos = cursor
+        while part < len(self._markdown) and pos >= len(self._get_markdown(part)):
+            part, pos = part + 1, 0
+        return part, pos
+
+    def _at_end(self, cursor: _Cursor) -> bool:
+        return cursor[0] >= len(self._markdown)
+
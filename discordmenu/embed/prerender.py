@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterable, Mapping, Optional
+
+from discordmenu.embed.wrapper import EmbedWrapper
+
+logger = logging.getLogger('discordmenu.prerender')
+
+_speculative: ContextVar[bool] = ContextVar('discordmenu_speculative', default=False)
+
+
+def is_speculative() -> bool:
+    """True while building a pane ahead of a click, so that the build doesn't start prefetching on its own."""
+    return _speculative.get()
+
+
+class _Entry:
+    def __init__(self, fingerprint: str, expires_at: float):
+        # the state the message showed when the panes were built from it
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.panes: Dict[str, asyncio.Future] = {}
+
+    def cancel(self) -> None:
+        for future in self.panes.values():
+            future.cancel()
+
+
+class Prerenderer:
+    """
+    Panes built ahead of the click that would show them, keyed by message id. After a transition, the panes that
+    the message's other buttons lead to are built in the background, and a click that lands while the message
+    still shows the same state picks its pane up instead of building it.
+
+    At most `max_tasks` panes are built at a time; panes over that budget are skipped. The panes built for a
+    message are dropped `ttl` seconds later, or as soon as the message moves on to another state.
+    """
+
+    def __init__(self, max_tasks: int = 8, ttl: float = 30, max_size: int = 256):
+        self.max_tasks = max_tasks
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.scheduled = 0
+        self.skipped = 0
+        self._running = 0
+        self._data: "OrderedDict[int, _Entry]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def schedule(self, message_id: int, ims: Mapping[str, Any], emojis: Iterable[str],
+                 build: Callable[[str], Awaitable[Optional[EmbedWrapper]]]) -> None:
+        """Start building the pane each of `emojis` leads to from `ims`, with `build(emoji)`."""
+        self._sweep()
+        self.discard(message_id)
+        entry = self._data[message_id] = _Entry(_fingerprint(ims), time.monotonic() + self.ttl)
+        for emoji in emojis:
+            if emoji in entry.panes:
+                continue
+            if self._running >= self.max_tasks:
+                self.skipped += 1
+                continue
+            entry.panes[emoji] = self._start(build, emoji)
+            self.scheduled += 1
+        while len(self._data) > self.max_size:
+            _, evicted = self._data.popitem(last=False)
+            evicted.cancel()
+
+    async def take(self, message_id: int, ims: Mapping[str, Any], emoji: str) -> Optional[EmbedWrapper]:
+        """
+        The pane clicking `emoji` on a message that shows `ims` leads to, if it was built ahead of time, waiting
+        for it if it is still being built. None if it wasn't, or if building it failed.
+        """
+        entry = self._data.get(message_id)
+        future = entry.panes.pop(emoji, None) if entry is not None else None
+        if future is None or entry.expires_at <= time.monotonic() or entry.fingerprint != _fingerprint(ims):
+            self.misses += 1
+            return None
+        try:
+            pane = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+            pane = None
+        except Exception:
+            # built again for the click, which surfaces the error if there is one
+            pane = None
+        if pane is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pane
+
+    def discard(self, message_id: int) -> None:
+        entry = self._data.pop(message_id, None)
+        if entry is not None:
+            entry.cancel()
+
+    def clear(self) -> None:
+        for entry in self._data.values():
+            entry.cancel()
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'running': self._running,
+            'scheduled': self.scheduled,
+            'skipped': self.skipped,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def _start(self, build: Callable[[str], Awaitable[Optional[EmbedWrapper]]], emoji: str) -> asyncio.Future:
+        async def run():
+            _speculative.set(True)
+            return await build(emoji)
+
+        self._running += 1
+        future = asyncio.ensure_future(run())
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: asyncio.Future) -> None:
+        self._running -= 1
+        if not future.cancelled() and future.exception() is not None:
+            logger.debug('Building a pane ahead of time failed', exc_info=future.exception())
+
+    def _sweep(self) -> None:
+        now = time.monotonic()
+        while self._data:
+            message_id, entry = next(iter(self._data.items()))
+            if entry.expires_at > now:
+                break
+            del self._data[message_id]
+            entry.cancel()
+
+
+def _fingerprint(ims: Mapping[str, Any]) -> str:
+    return json.dumps(dict(ims), sort_keys=True, default=str)
+
+
+prerenderer = Prerenderer()
@@ -0,0 +1,71 @@
+import hashlib
+from typing import Any, Dict, FrozenSet, Optional, Set, Tuple
+
+from discord import Embed
+
+# the part that carries the intra message state by default, see discordmenu.menu.footer
+IMS_PARTS: FrozenSet[str] = frozenset({'footer_icon_url'})
+
+
+def _hash(value: Any) -> bytes:
+    # parts are strings, numbers, None or lists of those, whose reprs are unambiguous
+    return hashlib.blake2b(repr(value).encode(), digest_size=8).digest()
+
+
+class EmbedSnapshot:
+    """
+    Hashes of each part of a rendered embed, and of each of its fields, so that two renders can be compared
+    part by part. Only what the bot sets is hashed, so an embed sent back by Discord, with its proxy urls and
+    image sizes, snapshots the same as the embed it was built from.
+    """
+
+    def __init__(self, parts: Dict[str, bytes], fields: Tuple[bytes, ...]):
+        self.parts = parts
+        self.fields = fields
+        self.fingerprint = hashlib.blake2b(b''.join(parts.values()) + b''.join(fields), digest_size=16).digest()
+
+    @staticmethod
+    def of(embed: Embed) -> "EmbedSnapshot":
+        data = embed.to_dict()
+        author = data.get('author', {})
+        footer = data.get('footer', {})
+        # empty values and missing ones look the same in Discord, and come back missing
+        parts = {
+            'title': data.get('title') or None,
+            'url': data.get('url') or None,
+            'color': data.get('color') or None,
+            'description': data.get('description') or None,
+            'author': [author.get('name') or None, author.get('url') or None, author.get('icon_url') or None],
+            'footer': footer.get('text') or None,
+            'footer_icon_url': footer.get('icon_url') or None,
+            'image': data.get('image', {}).get('url') or None,
+            'thumbnail': data.get('thumbnail', {}).get('url') or None,
+            # compared as an instant, since Discord doesn't send it back formatted the way it was sent
+            'timestamp': embed.timestamp.timestamp() if embed.timestamp else None,
+        }
+        fields = tuple(_hash([f.get('name'), f.get('value'), bool(f.get('inline'))]) for f in data.get('fields', ()))
+        return EmbedSnapshot({k: _hash(v) for k, v in parts.items()}, fields)
+
+    def changes(self, previous: Optional["EmbedSnapshot"]) -> Set[str]:
+        """
+        The parts that differ from `previous`, with fields named `field:<index>`. Everything has changed if there
+        is no previous snapshot.
+        """
+        if previous is None:
+            return set(self.parts) | {'field:{}'.format(i) for i in range(len(self.fields))}
+        changed = {k for k, v in self.parts.items() if previous.parts.get(k) != v}
+        for i in range(max(len(self.fields), len(previous.fields))):
+            if i >= len(self.fields) or i >= len(previous.fields) or self.fields[i] != previous.fields[i]:
+                changed.add('field:{}'.format(i))
+        return changed
+
+    def __eq__(self, other):
+        return isinstance(other, EmbedSnapshot) and self.fingerprint == other.fingerprint
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+
+def is_state_only(changes: Set[str]) -> bool:
+    """True if nothing but the intra message state changed, so the message looks the same as before."""
+    return bool(changes) and changes <= IMS_PARTS
@@ -2,18 +2,28 @@ from typing import List, Union
 
 from discord import Emoji
 
-from discordmenu.embed.base import Box
+from discordmenu.embed.base import Box, MarkdownWriter
 
 
 class Text(Box):
     def __init__(self, value: Union[str, Box]):
         super().__init__(self)
-        self.value = value
+        self._value = value
 
-    def to_markdown(self) -> str:
-        if isinstance(self.value, Box):
-            return self.value.to_markdown()
-        return self.value
+    def _write_markdown(self, writer: MarkdownWriter) -> None:
+        if type(self._value) is str:
+            writer.write(self._value)
+        else:
+            writer.write_markdown(self._value)
+
+    @property
+    def value(self) -> Union[str, Box]:
+        return self._value
+
+    @value.setter
+    def value(self, value: Union[str, Box]) -> None:
+        self._value = value
+        self.invalidate_markdown()
 
 
 class LabeledText(Box):
@@ -25,8 +35,10 @@ class LabeledText(Box):
         else:
             self._value = value
 
-    def to_markdown(self) -> str:
-        return "{} {}".format(self._name.to_markdown(), self._value.to_markdown())
+    def _write_markdown(self, writer: MarkdownWriter) -> None:
+        writer.write_box(self._name)
+        writer.write(" ")
+        writer.write_markdown(self._value)
 
     @property
     def name(self) -> "BoldText":
@@ -35,6 +47,7 @@ class LabeledText(Box):
     @name.setter
     def name(self, name: Union[str, Box]) -> None:
         self._name = BoldText(name)
+        self.invalidate_markdown()
 
     @property
     def value(self) -> Box:
@@ -43,16 +56,19 @@ class LabeledText(Box):
     @value.setter
     def value(self, value: Union[str, Box]) -> None:
         self._value = Text(value)
+        self.invalidate_markdown()
 
 
 class LinkedText(Box):
     def __init__(self, name: str, link: str):
         super().__init__(self)
         self._name = Text(name)
-        self.link = link
+        self._link = link
 
-    def to_markdown(self) -> str:
-        return "[{}]({})".format(self._name.to_markdown(), self.link)
+    def _write_markdown(self, writer: MarkdownWriter) -> None:
+        writer.write("[")
+        writer.write_box(self._name)
+        writer.write("]({})".format(self._link))
 
     @property
     def name(self) -> Text:
@@ -61,6 +77,16 @@ class LinkedText(Box):
     @name.setter
     def name(self, value: Union[str, Box]) -> None:
         self._name = Text(value)
+        self.invalidate_markdown()
+
+    @property
+    def link(self) -> str:
+        return self._link
+
+    @link.setter
+    def link(self, link: str) -> None:
+        self._link = link
+        self.invalidate_markdown()
 
 
 class BoldText(Box):
@@ -68,8 +94,10 @@ class BoldText(Box):
         super().__init__(self)
         self._value = Text(value)
 
-    def to_markdown(self) -> str:
-        return "**{}**".format(self._value.to_markdown())
+    def _write_markdown(self, writer: MarkdownWriter) -> None:
+        writer.write("**")
+        writer.write_box(self._value)
+        writer.write("**")
 
     @property
     def value(self) -> Text:
@@ -78,6 +106,7 @@ class BoldText(Box):
     @value.setter
     def value(self, value: Union[str, Box]) -> None:
         self._value = Text(value)
+        self.invalidate_markdown()
 
 
 class InlineText(Box):
@@ -85,8 +114,10 @@ class InlineText(Box):
         super().__init__(self)
         self._value = Text(value)
 
-    def to_markdown(self) -> str:
-        return "`{}`".format(self._value.to_markdown())
+    def _write_markdown(self, writer: MarkdownWriter) -> None:
+        writer.write("`")
+        writer.write_box(self._value)
+        writer.write("`")
 
     @property
     def value(self) -> Text:
@@ -95,6 +126,7 @@ class InlineText(Box):
     @value.setter
     def value(self, value: Union[str, Box]) -> None:
         self._value = Text(value)
+        self.invalidate_markdown()
 
 
 class BlockText(Box):
@@ -102,8 +134,10 @@ class BlockText(Box):
         super().__init__(self)
         self._value = Text(value)
 
-    def to_markdown(self) -> str:
-        return "```\n{}\n```".format(self._value.to_markdown())
+    def _write_markdown(self, writer: MarkdownWriter) -> None:
+        writer.write("```\n")
+        writer.write_box(self._value)
+        writer.write("\n```")
 
     @property
     def value(self) -> Text:
@@ -112,20 +146,39 @@ class BlockText(Box):
     @value.setter
     def value(self, value: Union[str, Box]) -> None:
         self._value = Text(value)
+        self.invalidate_markdown()
 
 
 class HighlightableLinks(Box):
     def __init__(self, links: List[LinkedText], highlighted: int, delimiter: str = ", "):
-        super().__init__(self)
-        self.delimiter = delimiter
-        self.links = links
+        super().__init__(self, delimiter=delimiter)
+        self._links = links
         self._highlighted = links[highlighted]
 
     def _get_link_markdown(self, link: LinkedText) -> str:
         return link.to_markdown() if link != self.highlighted else BoldText(link.name.value).to_markdown()
 
-    def to_markdown(self) -> str:
-        return self.delimiter.join([self._get_link_markdown(link) for link in self.links])
+    def _write_markdown(self, writer: MarkdownWriter) -> None:
+        for i, link in enumerate(self._links):
+            if i:
+                writer.write(self._delimiter)
+            if link != self.highlighted:
+                writer.write_box(link)
+            else:
+                writer.write("**")
+                writer.write_box(link.name)
+                writer.write("**")
+            if writer.full:
+                return
+
+    @property
+    def links(self) -> List[LinkedText]:
+        return self._links
+
+    @links.setter
+    def links(self, links: List[LinkedText]) -> None:
+        self._links = links
+        self.invalidate_markdown()
 
     @property
     def highlighted(self) -> LinkedText:
@@ -135,13 +188,23 @@ class HighlightableLinks(Box):
     def highlighted(self, highlighted: int) -> None:
         if len(self.links) <= highlighted < 0:
             raise Exception("Selected is out of bounds")
-        self.highlighted = self.links[highlighted]
+        self._highlighted = self.links[highlighted]
+        self.invalidate_markdown()
 
 
 class CustomEmoji(Box):
     def __init__(self, emoji: Emoji):
         super().__init__(self)
-        self.emoji = emoji
+        self._emoji = emoji
+
+    def _write_markdown(self, writer: MarkdownWriter) -> None:
+        writer.write("<{}:{}:{}>".format("a" if self._emoji.animated else "", self._emoji.name, self._emoji.id))
+
+    @property
+    def emoji(self) -> Emoji:
+        return self._emoji
 
-    def to_markdown(self) -> str:
-        return "<{}:{}:{}>".format("a" if self.emoji.animated else "", self.emoji.name, self.emoji.id)
+    @emoji.setter
+    def emoji(self, emoji: Emoji) -> None:
+        self._emoji = emoji
+        self.invalidate_markdown()
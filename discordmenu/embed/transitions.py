@@ -71,6 +71,21 @@ class EmbedTransitions:
                 ret.update({i: v.transition_func for i in k})
         return ret
 
+    @classmethod
+    def is_foldable(cls, emoji: str) -> bool:
+        """
+        Transitions marked `foldable=True` only compute the next state from the IMS they are given and have
+        no other side effects, so several queued clicks can be applied in memory with a single message edit.
+        """
+        for k, v in cls.DATA.items():
+            if emoji == k or (not isinstance(k, str) and isinstance(k, Sequence) and emoji in k):
+                return bool(v.kwargs.get('foldable'))
+        return False
+
+    @classmethod
+    def foldable_emoji_names(cls) -> List[str]:
+        return [e for e in cls.all_emoji_names() if cls.is_foldable(e)]
+
     @classmethod
     def pane_types(cls):
         return {v.kwargs['pane_type']: v.transition_func for k, v in cls.DATA.items()}
@@ -1,17 +1,76 @@
-from typing import List, Optional
+import logging
+from typing import Dict, List, Optional, Tuple
 
 from discord import Embed
 
 from discordmenu.embed.components import EmbedMain, EmbedAuthor, EmbedFooter, EmbedThumbnail, EmbedBodyImage, \
-    EmbedField
+    EmbedField, ChunkOverflow
+
+logger = logging.getLogger('discordmenu.embed.view')
 
 HIDDEN_CHAR = "\u200b"
+ELLIPSIS = "\u2026"
+
+FIELD_VALUE_LIMIT = 1024
+MAX_FIELDS = 25
+EMBED_TOTAL_LIMIT = 6000
+
+DROPPED_TRUNCATED = 'truncated'
+DROPPED_FIELD_LIMIT = 'field_limit'
+DROPPED_LENGTH_LIMIT = 'length_limit'
+
+
+class EmbedChunkError(Exception):
+    pass
+
+
+class DroppedContent:
+    def __init__(self, field_name: str, text: str, reason: str):
+        self.field_name = field_name
+        self.text = text
+        # one of DROPPED_TRUNCATED, DROPPED_FIELD_LIMIT or DROPPED_LENGTH_LIMIT
+        self.reason = reason
+
+    def __repr__(self):
+        return "DroppedContent({!r}, {} characters, {!r})".format(self.field_name, len(self.text), self.reason)
 
 
 def _get_field_name(field: EmbedField, first_chunk: bool) -> str:
     return field.name.value if first_chunk else field.continuation_title or HIDDEN_CHAR
 
 
+def _get_field_markdown(field: EmbedField) -> str:
+    value = field.value
+    return value if isinstance(value, str) else value.to_markdown()
+
+
+def _next_chunk(markdown: str, pos: int, chunk_size: int, delimiter: str, overflow: str) -> Tuple[str, int, str]:
+    """
+    The body of the chunk of at most `chunk_size` characters that starts at `pos`, the offset of the chunk after
+    it, and the text that was cut from the chunk's line if it had to be truncated.
+    """
+    limit = pos + chunk_size
+    delimiter_index = markdown.rfind(delimiter, pos, limit)
+    if delimiter_index != -1:
+        return markdown[pos:delimiter_index], delimiter_index + len(delimiter), ''
+
+    # the line starting at pos doesn't fit in one chunk
+    if overflow == ChunkOverflow.HARD_WRAP:
+        return markdown[pos:limit], limit, ''
+    if overflow == ChunkOverflow.WORD_WRAP:
+        space_index = markdown.rfind(' ', pos, limit)
+        if space_index <= pos:
+            return markdown[pos:limit], limit, ''
+        return markdown[pos:space_index], space_index + 1, ''
+    if overflow == ChunkOverflow.TRUNCATE:
+        line_end = markdown.find(delimiter, limit)
+        next_pos = len(markdown) if line_end == -1 else line_end + len(delimiter)
+        line_end = len(markdown) if line_end == -1 else line_end
+        cut = limit - len(ELLIPSIS)
+        return markdown[pos:cut] + ELLIPSIS, next_pos, markdown[cut:line_end]
+    raise EmbedChunkError("Could not chunk by delimiter")
+
+
 class EmbedView:
     def __init__(self,
                  embed_main: EmbedMain,
@@ -27,6 +86,8 @@ class EmbedView:
         self.embed_main = embed_main
         self.embed_fields = [f for f in embed_fields if f] if embed_fields else []
         self.embed_footer = embed_footer
+        # content left out of the last embed built by to_embed
+        self.dropped_content: List[DroppedContent] = []
 
     def to_embed(self) -> Embed:
         embed = Embed(**self.embed_main)
@@ -39,38 +100,80 @@ class EmbedView:
         if self.embed_footer is not None:
             embed.set_footer(**self.embed_footer)
 
-        for field in self._chunk_embed_fields(1024):
+        for field in self._chunk_embed_fields(FIELD_VALUE_LIMIT, EMBED_TOTAL_LIMIT - len(embed)):
             embed.add_field(**field)
 
+        limited = [d for d in self.dropped_content if d.reason != DROPPED_TRUNCATED]
+        if limited:
+            logger.warning('Dropped %d characters from %d fields to fit the embed limits',
+                           sum(len(d.text) for d in limited), len(limited))
         return embed
 
-    def _chunk_embed_fields(self, chunk_size: int) -> List[EmbedField]:
+    def ims_urls(self) -> Dict[str, Optional[str]]:
+        """
+        The urls of the embed parts that can carry an intra message state, as to_embed sets them, so the state can
+        be read without rendering the embed.
+        """
+        if type(self).to_embed is not EmbedView.to_embed:
+            embed = self.to_embed()
+            return {
+                'author': embed.author.icon_url,
+                'image': embed.image.url,
+                'footer': embed.footer.icon_url,
+                'thumbnail': embed.thumbnail.url,
+            }
+        return {
+            'author': self.embed_author.icon_url if self.embed_author is not None else None,
+            'image': self.embed_body_image.url if self.embed_body_image is not None else None,
+            'footer': self.embed_footer.icon_url if self.embed_footer is not None else None,
+            'thumbnail': self.embed_thumbnail.url if self.embed_thumbnail is not None else None,
+        }
+
+    def _chunk_embed_fields(self, chunk_size: int, max_length: Optional[int] = None,
+                            max_fields: int = MAX_FIELDS) -> List[EmbedField]:
+        """
+        Split each field's markdown at its chunk delimiter into fields of at most `chunk_size` characters.
+        Chunks past `max_fields`, or whose names and values don't fit in `max_length` characters, are dropped;
+        the dropped text is recorded in `dropped_content`.
+        """
         chunks = []
+        self.dropped_content = []
+        remaining_length = max_length
         for field in self.embed_fields:
-            remaining = field.value.to_markdown()
+            markdown = _get_field_markdown(field)
+            end = len(markdown)
+            pos = 0
             first_chunk = True
-            while len(remaining) > 0:
+            while pos < end:
                 field_name = _get_field_name(field, first_chunk)
-                if len(remaining) <= chunk_size:
-                    chunks.append(EmbedField(field_name, remaining, field.inline))
+                if len(chunks) >= max_fields:
+                    self._drop(field, markdown[pos:], DROPPED_FIELD_LIMIT)
                     break
 
-                left = remaining[:chunk_size]
-                right = remaining[chunk_size:]
-
-                delimiter_index = left.rfind(field.chunk_delimiter)
-                if delimiter_index == -1:
-                    raise Exception("Could not chunk by delimiter")
-
-                left_body = left[:delimiter_index]
-
-                chunks.append(EmbedField(field_name, left_body, field.inline))
-                if first_chunk:
+                if end - pos <= chunk_size:
+                    body, next_pos = markdown[pos:], end
+                else:
+                    body, next_pos, truncated = _next_chunk(markdown, pos, chunk_size, field.chunk_delimiter,
+                                                            field.overflow)
+                    if truncated:
+                        self._drop(field, truncated, DROPPED_TRUNCATED)
+
+                if body:
+                    chunk = EmbedField(field_name, body, field.inline)
+                    if remaining_length is not None:
+                        remaining_length -= len(chunk['name']) + len(body)
+                        if remaining_length < 0:
+                            self._drop(field, markdown[pos:], DROPPED_LENGTH_LIMIT)
+                            remaining_length = 0
+                            break
+                    chunks.append(chunk)
                     first_chunk = False
-
-                remaining = left[delimiter_index + 1:] + right
+                pos = next_pos
         return chunks
 
+    def _drop(self, field: EmbedField, text: str, reason: str) -> None:
+        self.dropped_content.append(DroppedContent(field.name.to_markdown(), text, reason))
+
     @staticmethod
     def from_message(existing_embed: Embed) -> "EmbedView":
         main = EmbedMain(existing_embed.title, existing_embed.url, existing_embed.colour, existing_embed.description)
@@ -0,0 +1,172 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+from discord import Embed
+
+from discordmenu.embed.components import EmbedMain
+from discordmenu.embed.view import EmbedView
+from discordmenu.embed.view_state import ViewState
+from discordmenu.intra_message_state import IntraMessageState, DEFAULT_QUERY_PARAM_KEYS
+
+# the embed parts that can carry an intra message state, and the url in each
+_IMS_SLOTS = {
+    'author': 'icon_url',
+    'image': 'url',
+    'footer': 'icon_url',
+    'thumbnail': 'url',
+}
+
+
+class _CachedEmbed:
+    def __init__(self, data: Dict[str, Any], ims_slots: List[Tuple[str, str, str]]):
+        self.data = data
+        # (part, url with the state removed, query param key) for each part that carried the state
+        self.ims_slots = ims_slots
+
+
+class PrerenderedView(EmbedView):
+    """A view rendered ahead of time, e.g. for another state with the same view state keys, with this state's IMS."""
+
+    def __init__(self, cached: _CachedEmbed, serialized_state: Dict[str, Any]):
+        super().__init__(EmbedMain())
+        self.cached = cached
+        self.serialized_state = serialized_state
+        self._state_urls: Optional[Dict[str, str]] = None
+
+    def to_embed(self) -> Embed:
+        data = dict(self.cached.data)
+        if 'fields' in data:
+            data['fields'] = [dict(f) for f in data['fields']]
+        for part, url in self.state_urls().items():
+            data[part] = dict(data[part])
+            data[part][_IMS_SLOTS[part]] = url
+        return Embed.from_dict(data)
+
+    def ims_urls(self) -> Dict[str, Optional[str]]:
+        urls = {part: self.cached.data.get(part, {}).get(url_key) for part, url_key in _IMS_SLOTS.items()}
+        urls.update(self.state_urls())
+        return urls
+
+    def state_urls(self) -> Dict[str, str]:
+        """The url of each part that carries this state, serialized once however often the view is rendered."""
+        if self._state_urls is None:
+            self._state_urls = {
+                part: IntraMessageState.serialize(base_url, self.serialized_state, query_param_key)
+                for part, base_url, query_param_key in self.cached.ims_slots
+            }
+        return self._state_urls
+
+
+class ViewCache:
+    """
+    Rendered embeds of views that are pure functions of part of their state, so that clicking back to a pane
+    doesn't build and render its view again. A view opts in by declaring the serialized state keys it depends
+    on as `VIEW_STATE_KEYS`; views without it are always built. The state itself is put back into the cached
+    embed on every hit, so the intra message state is always current.
+    """
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self._data: "OrderedDict[Hashable, _CachedEmbed]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def render(self, view_fn: Callable[[ViewState], EmbedView], state: ViewState) -> EmbedView:
+        """Build `view_fn(state)`, or reuse its embed for an earlier state with the same view state keys."""
+        view = self.get(view_fn, state)
+        if view is None:
+            view = view_fn(state)
+            if getattr(view_fn, 'VIEW_STATE_KEYS', None) is not None:
+                view = self.put(view_fn, state, view.to_embed().to_dict())
+        return view
+
+    def get(self, view_fn: Callable[[ViewState], EmbedView], state: ViewState) -> Optional[EmbedView]:
+        serialized = state.serialize()
+        key = self._key(view_fn, state.menu_type, serialized)
+        if key is None:
+            self.uncacheable += 1
+            return None
+        cached = self._data.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return PrerenderedView(cached, serialized)
+
+    def put(self, view_fn: Callable[[ViewState], EmbedView], state: ViewState,
+            embed_data: Dict[str, Any]) -> Optional[EmbedView]:
+        """Store the embed `view_fn(state)` rendered to, returning a view of it, or None if the view isn't cacheable."""
+        serialized = state.serialize()
+        key = self._key(view_fn, state.menu_type, serialized)
+        if key is None:
+            return None
+        cached = self._data[key] = _cache_embed(embed_data)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+        return PrerenderedView(cached, serialized)
+
+    @staticmethod
+    def _key(view_fn: Callable[[ViewState], EmbedView], menu_type: str,
+             serialized: Dict[str, Any]) -> Optional[Hashable]:
+        keys = getattr(view_fn, 'VIEW_STATE_KEYS', None)
+        if keys is None:
+            return None
+        return menu_type, view_fn, _state_key(serialized, keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'uncacheable': self.uncacheable,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _state_key(serialized: Dict[str, Any], keys: Tuple[str, ...]) -> Hashable:
+    # the values themselves rather than a digest of them: str hashes are cached, so this is cheaper for long
+    # messages, and two states can't collide
+    return tuple(_freeze(serialized.get(k)) for k in keys)
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _cache_embed(data: Dict[str, Any]) -> _CachedEmbed:
+    ims_slots = []
+    for part, url_key in _IMS_SLOTS.items():
+        url = data.get(part, {}).get(url_key)
+        query_param_key = DEFAULT_QUERY_PARAM_KEYS[part]
+        base_url = _without_query_param(url, query_param_key) if url else None
+        if base_url is not None:
+            ims_slots.append((part, base_url, query_param_key))
+    return _CachedEmbed(data, ims_slots)
+
+
+def _without_query_param(url: str, query_param_key: str) -> Optional[str]:
+    """`url` without the query param, or None if it doesn't have it."""
+    url_parts = list(urlparse(url))
+    query = parse_qsl(url_parts[4])
+    if not any(k == query_param_key for k, _ in query):
+        return None
+    url_parts[4] = urlencode([(k, v) for k, v in query if k != query_param_key])
+    return urlunparse(url_parts)
+
+
+view_cache = ViewCache()
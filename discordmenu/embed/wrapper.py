@@ -1,10 +1,11 @@
-from typing import Union, Iterable
+from typing import Dict, Union, Iterable
 
 from discord import Message
 
 from discordmenu.embed.emoji import EmojiRef, MultiEmojiRef
 from discordmenu.embed.view import EmbedView
 from discordmenu.emoji.emoji_cache import emoji_cache
+from discordmenu.intra_message_state import IntraMessageState
 
 
 class EmbedWrapper:
@@ -13,6 +14,10 @@ class EmbedWrapper:
         self.embed_view = embed_view
         self.emoji_buttons = [emoji_cache.get_name_by_name(e) for e in emoji_buttons or []]
 
+    def extract_ims(self) -> Dict:
+        """The intra message state the view shows, read without rendering the view; see IntraMessageState.resolve."""
+        return IntraMessageState.extract_data_from_urls(self.embed_view.ims_urls())
+
     @staticmethod
     def from_message(message: Message) -> "EmbedWrapper":
         emojis = [r.emoji for r in message.reactions]
@@ -1,6 +1,7 @@
-from typing import List, Union, Sequence
+from typing import Dict, List, Tuple, Union, Sequence, Iterable
 
 from discord import Emoji as Emoji
+from discord import Guild
 from discord.ext.commands import Bot
 
 
@@ -8,10 +9,32 @@ def is_ascii(s):
     return all(ord(c) < 128 for c in s)
 
 
+def _emoji_key(e: Emoji) -> Tuple[int, str, bool]:
+    return e.id, e.name, e.animated
+
+
 class EmojiCache:
     def __init__(self, guild_ids: List[int]):
         self.guild_ids = guild_ids
-        self.custom_emojis: List[Emoji] = []
+        self._custom_emojis: List[Emoji] = []
+        # emojis with the same name in several guilds are kept in load order; the first one wins lookups
+        self._emojis_by_name: Dict[str, List[Emoji]] = {}
+        self._emoji_strs: Dict[str, str] = {}
+        self._fallbacks: Dict[Tuple[str, ...], str] = {}
+
+    @property
+    def custom_emojis(self) -> List[Emoji]:
+        """Assign a new list rather than mutating this one, otherwise the name index goes stale."""
+        return self._custom_emojis
+
+    @custom_emojis.setter
+    def custom_emojis(self, emojis: List[Emoji]) -> None:
+        self._custom_emojis = emojis
+        self._emojis_by_name = {}
+        self._emoji_strs = {}
+        self._fallbacks = {}
+        for e in emojis:
+            self._index(e)
 
     def set_guild_ids(self, guild_ids: List[int]) -> None:
         self.guild_ids = guild_ids
@@ -22,43 +45,72 @@ class EmojiCache:
     def refresh_from_emojis(self, emojis: List[Emoji]) -> None:
         self.custom_emojis = emojis
 
+    def update_guild_emojis(self, guild: Guild, before: Sequence[Emoji], after: Sequence[Emoji]) -> None:
+        """Apply an `on_guild_emojis_update` event without rebuilding the whole cache."""
+        if guild.id not in self.guild_ids:
+            return
+        # discord.py builds new Emoji objects on every update, so compare what the cache actually uses
+        before_keys = {_emoji_key(e) for e in before}
+        after_keys = {_emoji_key(e) for e in after}
+        removed = [e for e in before if _emoji_key(e) not in after_keys]
+        added = [e for e in after if _emoji_key(e) not in before_keys]
+        if not removed and not added:
+            return
+
+        removed_ids = {e.id for e in removed}
+        self._custom_emojis = [e for e in self._custom_emojis if e.id not in removed_ids] + added
+        self._fallbacks = {}
+        for e in removed:
+            self._unindex(e)
+        for e in added:
+            self._index(e)
+
+    def _index(self, e: Emoji) -> None:
+        emojis = self._emojis_by_name.setdefault(e.name, [])
+        emojis.append(e)
+        if len(emojis) == 1:
+            self._emoji_strs[e.name] = str(e)
+
+    def _unindex(self, e: Emoji) -> None:
+        emojis = [x for x in self._emojis_by_name.get(e.name, []) if x.id != e.id]
+        if emojis:
+            self._emojis_by_name[e.name] = emojis
+            self._emoji_strs[e.name] = str(emojis[0])
+        else:
+            self._emojis_by_name.pop(e.name, None)
+            self._emoji_strs.pop(e.name, None)
+
     def get_by_name(self, names: Union[str, Sequence[str]]) -> Union[Emoji, str]:
-        return self._get_value_by_name(names, self._emoji)
+        if isinstance(names, str):
+            emojis = self._emojis_by_name.get(names)
+            return emojis[0] if emojis else names
+        return self._resolve_fallbacks(names)
 
     def get_name_by_name(self, names: Union[str, Sequence[str]]) -> Union[Emoji, str]:
-        return self._get_value_by_name(names, self._emoji_name)
+        if isinstance(names, str):
+            return names
+        return self._resolve_fallbacks(names)
 
-    def _get_value_by_name(self, names: Union[str, Sequence[str]], f) -> Union[Emoji, str]:
+    def _resolve_fallbacks(self, names: Iterable[str]) -> str:
         # names will be a tuple if looking up immediately from an emoji list
         # but it becomes a list when deserialized from an ims
-        if isinstance(names, str):
-            res = [f(e) for e in self.custom_emojis if e.name == names]
-            return res[0] if len(res) > 0 else names
-        else:
+        key = tuple(names)
+        ret = self._fallbacks.get(key)
+        if ret is None:
             # return the first success, if there is one
             # otherwise just return the last thing, which is presumed to be a default emoji
             # a list of length 0 is invalid input
-            if len(names) == 0:
+            if len(key) == 0:
                 raise KeyError
-            for name in names:
-                res = [e.name for e in self.custom_emojis if e.name == name]
-                if len(res) > 0:
-                    return res[0]
-            return self.get_by_name(names[-1])
-
-    @staticmethod
-    def _emoji(e: Emoji) -> Emoji:
-        return e
-
-    @staticmethod
-    def _emoji_name(e: Emoji) -> str:
-        return e.name
+            ret = next((name for name in key if name in self._emojis_by_name), key[-1])
+            self._fallbacks[key] = ret
+        return ret
 
     def get_emoji(self, name: str) -> str:
         """Use for getting an emoji name to print in text"""
-        for e in self.custom_emojis:
-            if e.name == name:
-                return str(e)
+        emoji_str = self._emoji_strs.get(name)
+        if emoji_str is not None:
+            return emoji_str
 
         # special case when a unicode character is specified
         if len(name) == 1 and not is_ascii(name):
@@ -68,9 +120,9 @@ class EmojiCache:
 
     def get_raw_emoji(self, name: str) -> str:
         """Same as get_emoji but no colons - use for getting a reaction name"""
-        for e in self.custom_emojis:
-            if e.name == name:
-                return str(e)
+        emoji_str = self._emoji_strs.get(name)
+        if emoji_str is not None:
+            return emoji_str
 
         # special case when a unicode character is specified
         if len(name) == 1 and not is_ascii(name):
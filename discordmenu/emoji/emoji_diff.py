@@ -0,0 +1,83 @@
+from typing import List, Sequence, Set, Tuple, Union, Optional
+
+from discord import Emoji
+
+from discordmenu.embed.emoji import EmojiRef
+
+ReactionEmoji = Union[str, Emoji]
+
+
+class EmojiDiff:
+    def __init__(self, add: List[EmojiRef], remove: List[ReactionEmoji], order_preserved: bool):
+        # emoji refs from the next menu, in button order
+        self.add = add
+        # reaction emojis currently on the message
+        self.remove = remove
+        # False if keeping the current reactions and appending `add` would not give the button order of the
+        # next menu. Callers that care about ordering can diff with `reorder` to clear and re-add them instead.
+        self.order_preserved = order_preserved
+
+
+def _emoji_name(emoji: ReactionEmoji) -> str:
+    # custom emojis the bot can't see come through as PartialEmoji, which also carries a name
+    return emoji if isinstance(emoji, str) else emoji.name
+
+
+def _ref_names(ref: Union[EmojiRef, Emoji]) -> Tuple[str, ...]:
+    if isinstance(ref, (tuple, list)):
+        # fallback emojis
+        return tuple(_emoji_name(e) for e in ref)
+    return _emoji_name(ref),
+
+
+def diff_emoji_refs(current_emojis: Sequence[ReactionEmoji],
+                    next_emojis: Sequence[Union[EmojiRef, Emoji]], reorder: bool = False) -> EmojiDiff:
+    """
+    Work out which reactions to add and remove to go from `current_emojis` to the buttons in `next_emojis`,
+    in time linear in the number of emojis. An emoji ref with fallbacks is satisfied by any of its names.
+
+    With `reorder`, a diff that wouldn't keep the button order instead removes every current reaction and adds
+    every button again; the removes have to be applied first.
+    """
+    current_names: List[str] = []
+    current_raw: List[ReactionEmoji] = []
+    current_set: Set[str] = set()
+    for emoji in current_emojis:
+        if not emoji:
+            continue
+        name = _emoji_name(emoji)
+        if name not in current_set:
+            current_set.add(name)
+            current_names.append(name)
+            current_raw.append(emoji)
+
+    next_set: Set[str] = set()
+    seen_refs: Set[Tuple[str, ...]] = set()
+    add: List[EmojiRef] = []
+    buttons: List[EmojiRef] = []
+    kept_in_next_order: List[str] = []
+    kept_after_add = False
+    for ref in next_emojis:
+        if not ref:
+            continue
+        names = _ref_names(ref)
+        next_set.update(names)
+        if names in seen_refs:
+            continue
+        seen_refs.add(names)
+        ref = tuple(ref) if isinstance(ref, list) else ref
+        buttons.append(ref)
+
+        match: Optional[str] = next((n for n in names if n in current_set), None)
+        if match is None:
+            add.append(ref)
+        else:
+            kept_in_next_order.append(match)
+            kept_after_add = kept_after_add or bool(add)
+
+    remove = [raw for name, raw in zip(current_names, current_raw) if name not in next_set]
+    kept_in_current_order = [name for name in current_names if name in next_set]
+    order_preserved = not kept_after_add and kept_in_current_order == kept_in_next_order
+    if reorder and not order_preserved:
+        return EmojiDiff(buttons, current_raw, order_preserved)
+    return EmojiDiff(add, remove, order_preserved)
@@ -0,0 +1,248 @@
+import base64
+import json
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+# Encoded states start with a single header byte: the low nibble is the codec id and COMPRESSED_FLAG marks a
+# deflated payload. Header bytes are always below 0x20, so they can never be confused with the first character
+# of the legacy format, which is plain JSON text.
+COMPRESSED_FLAG = 0x10
+_CODEC_ID_MASK = 0x0F
+_LEGACY_THRESHOLD = 0x20
+
+DEFAULT_COMPRESS_THRESHOLD = 96
+
+_TO_URLSAFE = str.maketrans('+/', '-_')
+
+IMS_STORE_KEY = '_ims_store_key'
+
+
+class ImsCodecError(Exception):
+    pass
+
+
+class ImsCodec(ABC):
+    codec_id: int = 0
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        pass
+
+
+class JsonImsCodec(ImsCodec):
+    codec_id = 1
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode()
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class CompactImsCodec(ImsCodec):
+    """
+    A small tagged binary format with varint lengths. It accepts and returns the same values as json,
+    including json's handling of non-string dict keys and tuples.
+    """
+    codec_id = 2
+
+    _NONE = 0x00
+    _FALSE = 0x01
+    _TRUE = 0x02
+    _INT = 0x03
+    _FLOAT = 0x04
+    _STR = 0x05
+    _LIST = 0x06
+    _DICT = 0x07
+    # ints in [0, 64) are packed into the tag byte itself
+    _SMALL_INT = 0x40
+
+    def encode(self, value: Any) -> bytes:
+        out = bytearray()
+        self._encode(value, out)
+        return bytes(out)
+
+    def decode(self, data: bytes) -> Any:
+        value, offset = self._decode(data, 0)
+        if offset != len(data):
+            raise ImsCodecError("Trailing data after compact IMS value")
+        return value
+
+    def _encode(self, value: Any, out: bytearray) -> None:
+        if value is None:
+            out.append(self._NONE)
+        elif value is True:
+            out.append(self._TRUE)
+        elif value is False:
+            out.append(self._FALSE)
+        elif isinstance(value, int):
+            if 0 <= value < 64:
+                out.append(self._SMALL_INT | value)
+            else:
+                out.append(self._INT)
+                _write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+        elif isinstance(value, float):
+            out.append(self._FLOAT)
+            out += struct.pack('>d', value)
+        elif isinstance(value, str):
+            out.append(self._STR)
+            _write_str(out, value)
+        elif isinstance(value, (list, tuple)):
+            out.append(self._LIST)
+            _write_varint(out, len(value))
+            for item in value:
+                self._encode(item, out)
+        elif isinstance(value, dict):
+            out.append(self._DICT)
+            _write_varint(out, len(value))
+            for key, item in value.items():
+                _write_str(out, key if isinstance(key, str) else _json_key(key))
+                self._encode(item, out)
+        else:
+            raise TypeError("Object of type {} is not IMS serializable".format(type(value).__name__))
+
+    def _decode(self, data: bytes, offset: int):
+        tag = data[offset]
+        offset += 1
+        if tag & self._SMALL_INT:
+            return tag & 0x3F, offset
+        if tag == self._NONE:
+            return None, offset
+        if tag == self._TRUE:
+            return True, offset
+        if tag == self._FALSE:
+            return False, offset
+        if tag == self._INT:
+            raw, offset = _read_varint(data, offset)
+            return (raw >> 1) if not raw & 1 else -((raw + 1) >> 1), offset
+        if tag == self._FLOAT:
+            return struct.unpack_from('>d', data, offset)[0], offset + 8
+        if tag == self._STR:
+            return _read_str(data, offset)
+        if tag == self._LIST:
+            count, offset = _read_varint(data, offset)
+            ret: List[Any] = []
+            for _ in range(count):
+                item, offset = self._decode(data, offset)
+                ret.append(item)
+            return ret, offset
+        if tag == self._DICT:
+            count, offset = _read_varint(data, offset)
+            ret_dict: Dict[str, Any] = {}
+            for _ in range(count):
+                key, offset = _read_str(data, offset)
+                ret_dict[key], offset = self._decode(data, offset)
+            return ret_dict, offset
+        raise ImsCodecError("Unknown compact IMS tag {}".format(tag))
+
+
+class StoreReferenceCodec(ImsCodec):
+    """
+    Encodes only the key of a state that was saved to an ImsStore. Decoding yields a placeholder
+    dict that `IntraMessageState.resolve` swaps for the stored state.
+    """
+    codec_id = 15
+
+    def encode(self, value: Any) -> bytes:
+        return value[IMS_STORE_KEY].encode()
+
+    def decode(self, data: bytes) -> Any:
+        return {IMS_STORE_KEY: data.decode()}
+
+
+def _json_key(key: Any) -> str:
+    if key is None or isinstance(key, (bool, int, float)):
+        return json.dumps(key)
+    raise TypeError("keys must be str, int, float, bool or None, not {}".format(type(key).__name__))
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, offset: int):
+    shift = 0
+    value = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _write_str(out: bytearray, value: str) -> None:
+    encoded = value.encode()
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+def _read_str(data: bytes, offset: int):
+    length, offset = _read_varint(data, offset)
+    end = offset + length
+    return data[offset:end].decode(), end
+
+
+IMS_CODECS: Dict[int, ImsCodec] = {}
+
+
+def register_codec(codec: ImsCodec) -> None:
+    if not 0 < codec.codec_id <= _CODEC_ID_MASK:
+        raise ValueError("Codec ids must be between 1 and {}".format(_CODEC_ID_MASK))
+    IMS_CODECS[codec.codec_id] = codec
+
+
+register_codec(JsonImsCodec())
+register_codec(CompactImsCodec())
+register_codec(StoreReferenceCodec())
+
+DEFAULT_CODEC = IMS_CODECS[CompactImsCodec.codec_id]
+
+
+def encode_state(value: Any, codec: Optional[ImsCodec] = None,
+                 compress_threshold: Optional[int] = DEFAULT_COMPRESS_THRESHOLD) -> str:
+    """
+    Encode a json compatible value into a URL safe string. Payloads longer than `compress_threshold` bytes are
+    deflated when that makes them smaller; pass None to never compress.
+    """
+    codec = codec or DEFAULT_CODEC
+    header = codec.codec_id
+    payload = codec.encode(value)
+    if compress_threshold is not None and len(payload) > compress_threshold:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+        compressed = compressor.compress(payload) + compressor.flush()
+        if len(compressed) < len(payload):
+            header |= COMPRESSED_FLAG
+            payload = compressed
+    return base64.urlsafe_b64encode(bytes([header]) + payload).rstrip(b'=').decode()
+
+
+def decode_state(data: str) -> Any:
+    """Decode a string produced by `encode_state`, or by the legacy base64 encoded JSON format."""
+    # legacy states use the standard base64 alphabet with padding
+    data = data.translate(_TO_URLSAFE).rstrip('=')
+    raw = base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+    if not raw:
+        raise ImsCodecError("Empty IMS payload")
+
+    header = raw[0]
+    if header >= _LEGACY_THRESHOLD:
+        return json.loads(raw)
+
+    codec = IMS_CODECS.get(header & _CODEC_ID_MASK)
+    if codec is None:
+        raise ImsCodecError("Unknown IMS codec {}".format(header & _CODEC_ID_MASK))
+    payload = raw[1:]
+    if header & COMPRESSED_FLAG:
+        payload = zlib.decompress(payload, -15)
+    return codec.decode(payload)
@@ -0,0 +1,83 @@
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional, Protocol
+
+
+class ImsStateNotFound(Exception):
+    def __init__(self, key: str):
+        super().__init__("No stored IMS for key {}".format(key))
+        self.key = key
+
+
+class ImsStore(Protocol):
+    """
+    Backend for IntraMessageState's store mode. Values are encoded states as produced by
+    `discordmenu.ims_codec.encode_state`, and keys are short URL safe strings.
+    """
+
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    async def put(self, key: str, data: bytes) -> None:
+        ...
+
+
+class MemoryImsStore:
+    """An in-process LRU store. States are lost when the bot restarts."""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        data = self._data.get(key)
+        if data is not None:
+            self._data.move_to_end(key)
+        return data
+
+    async def put(self, key: str, data: bytes) -> None:
+        self._data[key] = data
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+
+class SqliteImsStore:
+    """
+    A store backed by a local SQLite file. Queries run in the default executor so they don't block the event loop.
+    When `max_size` is set, the least recently written states beyond that many are deleted.
+    """
+
+    def __init__(self, path: str, max_size: Optional[int] = None):
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS ims_store (key TEXT PRIMARY KEY, data BLOB NOT NULL)")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._get, key)
+
+    async def put(self, key: str, data: bytes) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self._put, key, data)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM ims_store WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _put(self, key: str, data: bytes) -> None:
+        with self._lock, self._conn:
+            # REPLACE assigns a new rowid, so rowid order is write order; replaced rows leave gaps in the rowids,
+            # so the newest rows are counted rather than assumed to be the last `max_size` rowids
+            self._conn.execute("INSERT OR REPLACE INTO ims_store (key, data) VALUES (?, ?)", (key, data))
+            if self.max_size is not None:
+                self._conn.execute("DELETE FROM ims_store WHERE rowid NOT IN "
+                                   "(SELECT rowid FROM ims_store ORDER BY rowid DESC LIMIT ?)", (self.max_size,))
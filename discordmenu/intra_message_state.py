@@ -1,10 +1,21 @@
+import asyncio
 import base64
-import json
-from typing import Dict, Optional, Any
+import hashlib
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from copy import deepcopy
+from typing import Dict, Optional, Any, Mapping, MutableMapping, Iterator, Set, Tuple
 from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse, parse_qs
 
 from discord import Embed
 
+from discordmenu.ims_codec import ImsCodec, encode_state, decode_state, IMS_CODECS, IMS_STORE_KEY, \
+    StoreReferenceCodec
+from discordmenu.ims_store import ImsStore, ImsStateNotFound
+
+logger = logging.getLogger('discordmenu.intra_message_state')
+
 DEFAULT_QUERY_PARAM_KEYS = {
     'author': 'imsa',
     'image': 'imsi',
@@ -14,12 +25,43 @@ DEFAULT_QUERY_PARAM_KEYS = {
 
 _IntraMessageState = Dict[str, Any]
 
+# set while states are serialized off the event loop, where the store's pending writes can't be touched
+_store_disabled: "ContextVar[bool]" = ContextVar('ims_store_disabled', default=False)
+
 
 class IntraMessageState:
+    # When a store is set, states that encode to more than `store_threshold` characters are saved in it
+    # and the embed only carries their key.
+    store: Optional[ImsStore] = None
+    store_threshold: int = 0
+    _pending_writes: Dict[str, bytes] = {}
+    _flush_task: Optional[asyncio.Task] = None
+
     @staticmethod
-    def serialize(icon_url: str, json_dict: Any, query_param_key: str = 'imsf') -> str:
-        raw_bytes = base64.b64encode(json.dumps(json_dict).encode())
-        data = str(raw_bytes)[2:-1]
+    def set_store(store: Optional[ImsStore], threshold: int = 0) -> None:
+        IntraMessageState.store = store
+        IntraMessageState.store_threshold = threshold
+
+    @staticmethod
+    @contextmanager
+    def without_store() -> Iterator[None]:
+        """States serialized in this context, e.g. in an executor, ignore the store as if `use_store` were False."""
+        token = _store_disabled.set(True)
+        try:
+            yield
+        finally:
+            _store_disabled.reset(token)
+
+    @staticmethod
+    def serialize(icon_url: str, json_dict: Any, query_param_key: str = 'imsf',
+                  codec: Optional[ImsCodec] = None, use_store: bool = True) -> str:
+        data = encode_state(json_dict, codec)
+        if (use_store and IntraMessageState.store is not None and len(data) > IntraMessageState.store_threshold
+                and not _store_disabled.get()):
+            data = IntraMessageState._store_state(data)
+        if '?' not in icon_url and '#' not in icon_url:
+            # encoded states are URL safe, so there is nothing to merge or escape
+            return '{}?{}={}'.format(icon_url, query_param_key, data)
 
         params = {query_param_key: data}
         url_parts = list(urlparse(icon_url))
@@ -38,23 +80,30 @@ class IntraMessageState:
         if not data:
             return None
 
-        result_bytes = base64.b64decode(data[0])
-        return json.loads(result_bytes)
+        return decode_state(data[0])
 
     @staticmethod
     def extract_data(embed: Embed, query_param_keys: Optional[Dict] = None) -> Dict:
-        values_to_try = [
-            ('author', embed.author.icon_url),
-            ('image', embed.image.url),
-            ('footer', embed.footer.icon_url),
-            ('thumbnail', embed.thumbnail.url),
-        ]
+        """
+        The state carried by the embed. With a store set, a state that was saved in the store is returned as a
+        placeholder holding only its key, see `is_stored`; await `resolve` on the result, or use `load`, to get the
+        state itself. MenuListener does this before any menu or hook sees the state.
+        """
+        return IntraMessageState.extract_data_from_urls({
+            'author': embed.author.icon_url,
+            'image': embed.image.url,
+            'footer': embed.footer.icon_url,
+            'thumbnail': embed.thumbnail.url,
+        }, query_param_keys)
 
+    @staticmethod
+    def extract_data_from_urls(urls: Mapping[str, Optional[str]], query_param_keys: Optional[Dict] = None) -> Dict:
+        """`urls` maps each embed part that can carry the state to its url, see EmbedView.ims_urls."""
         if not query_param_keys:
             query_param_keys = DEFAULT_QUERY_PARAM_KEYS
 
         ret: Dict = {}
-        for key, url in values_to_try:
+        for key, url in urls.items():
             if not url:
                 continue
 
@@ -67,6 +116,68 @@ class IntraMessageState:
             IntraMessageState._merge_dicts(ret, data)
         return ret
 
+    @staticmethod
+    async def load(embed: Embed, query_param_keys: Optional[Dict] = None) -> Dict:
+        """`extract_data` with any stored state resolved. Raises ImsStateNotFound if the store no longer has it."""
+        return await IntraMessageState.resolve(IntraMessageState.extract_data(embed, query_param_keys))
+
+    @staticmethod
+    def is_stored(ims: Mapping[str, Any]) -> bool:
+        """True if `ims` is a placeholder for a state kept in the store, which `resolve` has yet to load."""
+        return IMS_STORE_KEY in ims
+
+    @staticmethod
+    async def resolve(ims: Dict) -> Dict:
+        """
+        Replace any store key found by `extract_data` with the state saved under it.
+        Raises ImsStateNotFound if the store no longer has the state.
+        """
+        keys = ims.get(IMS_STORE_KEY)
+        if keys is None:
+            return ims
+
+        ret = {k: v for k, v in ims.items() if k != IMS_STORE_KEY}
+        for key in (keys if isinstance(keys, list) else [keys]):
+            data = IntraMessageState._pending_writes.get(key)
+            if data is None and IntraMessageState.store is not None:
+                data = await IntraMessageState.store.get(key)
+            if data is None:
+                raise ImsStateNotFound(key)
+            IntraMessageState._merge_dicts(ret, decode_state(data.decode()))
+        return ret
+
+    @staticmethod
+    def _store_state(data: str) -> str:
+        # keys are content addressed, so identical states share a single stored entry
+        key = base64.urlsafe_b64encode(hashlib.sha256(data.encode()).digest()[:12]).decode()
+        IntraMessageState._pending_writes[key] = data.encode()
+        IntraMessageState._schedule_flush()
+        return encode_state({IMS_STORE_KEY: key}, IMS_CODECS[StoreReferenceCodec.codec_id], None)
+
+    @staticmethod
+    def _schedule_flush() -> None:
+        if IntraMessageState._flush_task is not None and not IntraMessageState._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # pending writes are still readable by resolve and get flushed by the next serialize on the loop
+            return
+        IntraMessageState._flush_task = loop.create_task(IntraMessageState._flush_pending_writes())
+
+    @staticmethod
+    async def _flush_pending_writes() -> None:
+        pending = IntraMessageState._pending_writes
+        while pending and IntraMessageState.store is not None:
+            key, data = next(iter(pending.items()))
+            try:
+                await IntraMessageState.store.put(key, data)
+            except Exception:
+                logger.exception("Failed to write IMS %s to the store", key)
+                return
+            if pending.get(key) is data:
+                del pending[key]
+
     @staticmethod
     def _merge_dicts(target: Dict, data: Dict) -> None:
         for key, val in data.items():
@@ -78,3 +189,66 @@ class IntraMessageState:
                 target[key].append(val)
             else:
                 target[key] = val
+
+
+class ImsView(MutableMapping[str, Any]):
+    """
+    A copy-on-write view over a decoded IMS that may be shared, e.g. by ImsCache. Writes stay in the view,
+    and nested lists and dicts are copied into the view the first time they are read, so the shared state
+    is never mutated.
+    """
+
+    def __init__(self, base: Mapping[str, Any], overlay: Optional[Dict[str, Any]] = None,
+                 deleted: Optional[Set[str]] = None):
+        self._base = base
+        self._overlay: Dict[str, Any] = overlay if overlay is not None else {}
+        self._deleted: Set[str] = deleted if deleted is not None else set()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._overlay:
+            return self._overlay[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        val = self._base[key]
+        if isinstance(val, (list, dict)):
+            val = self._overlay[key] = deepcopy(val)
+        return val
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._overlay[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._overlay.pop(key, None)
+        if key in self._base:
+            self._deleted.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._overlay or (key in self._base and key not in self._deleted)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._overlay
+        for key in self._base:
+            if key not in self._overlay and key not in self._deleted:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def copy(self) -> "ImsView":
+        return ImsView(self._base, dict(self._overlay), set(self._deleted))
+
+    def __copy__(self) -> "ImsView":
+        return self.copy()
+
+    def __deepcopy__(self, memo) -> "ImsView":
+        return ImsView(self._base, deepcopy(self._overlay, memo), set(self._deleted))
+
+    def __reduce__(self) -> Tuple[type, Tuple[Dict[str, Any]]]:
+        # the base may be a MappingProxyType, which can't be pickled; there is nothing left to share once pickled
+        return dict, (dict(self),)
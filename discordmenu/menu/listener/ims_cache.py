@@ -0,0 +1,50 @@
+from collections import OrderedDict
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+_ImsCacheKey = Tuple[int, Optional[datetime]]
+
+
+class ImsCache:
+    """
+    Decoded IMS keyed by message id and the message's edit timestamp, so an edit naturally misses the cache.
+    Cached states are read-only; wrap them in an ImsView before handing them to code that may modify them.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[_ImsCacheKey, Mapping[str, Any]]" = OrderedDict()
+
+    def get(self, message_id: int, edited_at: Optional[datetime]) -> Optional[Mapping[str, Any]]:
+        key = (message_id, edited_at)
+        ims = self._data.get(key)
+        if ims is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return ims
+
+    def put(self, message_id: int, edited_at: Optional[datetime], ims: Dict[str, Any]) -> Mapping[str, Any]:
+        frozen = MappingProxyType(ims)
+        key = (message_id, edited_at)
+        self._data[key] = frozen
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+        return frozen
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -1,39 +1,89 @@
+import asyncio
 import logging
-from copy import deepcopy
-from typing import Optional
+from collections import deque
+from typing import Optional, Mapping, Any, Dict, Deque, List, Set, Tuple
 
 import discord
 
 from discordmenu.embed.emoji import DEFAULT_EMOJI_LIST
-from discordmenu.intra_message_state import IntraMessageState
+from discordmenu.ims_store import ImsStateNotFound
+from discordmenu.discord_client import track_messages, track_menus
+from discordmenu.intra_message_state import IntraMessageState, ImsView
 from discordmenu.menu.listener.bot_protocol import BotSupportsMenus
 from discordmenu.menu.listener.errors import DiscordRatelimitFilter, MissingImsMenuType, InvalidImsMenuType, \
     CogNotLoaded
-from discordmenu.menu.listener.menu_map import MenuMap
+from discordmenu.menu.listener.ims_cache import ImsCache
+from discordmenu.menu.listener.menu_map import MenuMap, MenuMapEntry
+from discordmenu.menu.listener.message_cache import MessageCache
+from discordmenu.menu.listener.single_flight import SingleFlight
 from discordmenu.menu.listener.reaction_filter_list import ReactionFilterList
-from discordmenu.reaction_filter import ValidEmojiReactionFilter, BotAuthoredMessageReactionFilter, \
-    NotPosterEmojiReactionFilter
+from discordmenu.menu_registry import MenuRegistry
+from discordmenu.reaction_filter import ReactionFilterPipeline, NotPosterEmojiReactionFilter
 
 logger = logging.getLogger('discordmenu.menu_listener')
 logger.addFilter(DiscordRatelimitFilter())
 
+_DEFAULT_EMOJI_NAMES = frozenset(DEFAULT_EMOJI_LIST)
+
+
+class _Click:
+    __slots__ = ('emoji_clicked', 'member', 'ims', 'data')
+
+    def __init__(self, emoji_clicked: str, member, ims: Mapping[str, Any], data: dict):
+        self.emoji_clicked = emoji_clicked
+        self.member = member
+        # the state the message showed when the click was received
+        self.ims = ims
+        self.data = data
+
 
 class MenuListener:
     def __init__(self, discord_bot: BotSupportsMenus, menu_map: Optional[MenuMap] = None,
-                 reaction_filters: Optional[ReactionFilterList] = None):
+                 reaction_filters: Optional[ReactionFilterList] = None,
+                 menu_registry: Optional[MenuRegistry] = None,
+                 ims_cache: Optional[ImsCache] = None,
+                 message_cache: Optional[MessageCache] = None,
+                 child_concurrency: int = 5):
         super().__init__()
         self.bot = discord_bot
         self.menu_map: MenuMap = menu_map if menu_map else MenuMap()
-        self.reaction_filters: ReactionFilterList = reaction_filters if reaction_filters else ReactionFilterList()
+        # applied to every menu, and also checked against the bare event payload before the message is fetched
+        self._payload_pipeline: Optional[ReactionFilterPipeline] = None
+        self.reaction_filters = reaction_filters if reaction_filters else ReactionFilterList()
+        # when set, reactions on messages that aren't registered menus are ignored without fetching them
+        self.menu_registry = menu_registry
+        if menu_registry is not None:
+            track_menus(menu_registry)
+        self.ims_cache: ImsCache = ims_cache if ims_cache else ImsCache()
+        self.message_cache: MessageCache = message_cache if message_cache is not None else MessageCache()
+        track_messages(self.message_cache)
+        self._message_fetches = SingleFlight()
+        # child menus of one menu that are updated at the same time
+        self.child_concurrency = child_concurrency
+        # clicks waiting on a transition that is already running for the same message id
+        self._pending_clicks: Dict[int, Deque[_Click]] = {}
 
     @staticmethod
     def _emoji_was_removed_in_public_channel(channel, payload: discord.RawReactionActionEvent):
         return payload.event_type == "REACTION_REMOVE" and not isinstance(channel, discord.DMChannel)
 
     async def _fetch_message(self, channel, payload):
-        message = discord.utils.get(self.bot.cached_messages, id=payload.message_id)
+        return await self._get_message(channel, payload.message_id)
+
+    async def _get_message(self, channel, message_id: int) -> discord.Message:
+        message = self.message_cache.get(message_id)
+        if message is None:
+            message = discord.utils.get(self.bot.cached_messages, id=message_id)
         if message is None:
-            message = await channel.fetch_message(payload.message_id)
+            # reactions often come in bursts, so concurrent events for a message share a single request
+            message = await self._message_fetches.run((channel.id, message_id),
+                                                      lambda: self._fetch_and_cache(channel, message_id))
+        return message
+
+    async def _fetch_and_cache(self, channel, message_id: int) -> discord.Message:
+        message = await channel.fetch_message(message_id)
+        # don't overwrite a copy sent or edited while the fetch was in flight, which is at least as recent
+        self.message_cache.put(message, ttl=self.message_cache.fetched_ttl, replace=False)
         return message
 
     def _message_is_not_authored_by_bot(self, message):
@@ -48,11 +98,8 @@ class MenuListener:
 
         # determine if this is potentially a valid reaction prior to doing any network call:
         # this is true if it's a default emoji or in any of our global panes emoji lists
-        if emoji_clicked in DEFAULT_EMOJI_LIST:
+        if emoji_clicked in _DEFAULT_EMOJI_NAMES or emoji_clicked in self.menu_map.emoji_index():
             return emoji_clicked
-        for menu_type, menu_entry in self.menu_map.items():
-            if emoji_clicked in menu_entry.transitions.all_emoji_names():
-                return emoji_clicked
         return None
 
     async def _event_is_not_relevant(self, payload: discord.RawReactionActionEvent):
@@ -60,6 +107,12 @@ class MenuListener:
         if emoji_clicked is None:
             return True, None
 
+        if self.menu_registry is not None and payload.message_id not in self.menu_registry:
+            return True, None
+
+        if not self._get_payload_pipeline().allow_payload(payload):
+            return True, None
+
         channel = self.bot.get_channel(payload.channel_id)
 
         if self._emoji_was_removed_in_public_channel(channel, payload):
@@ -80,7 +133,7 @@ class MenuListener:
 
         member = payload.member or self.bot.get_user(payload.user_id)
 
-        ims = message.embeds and IntraMessageState.extract_data(message.embeds[0])
+        ims = await self._get_ims(message)
         if not ims:
             return True, None
 
@@ -94,18 +147,25 @@ class MenuListener:
         @commands.Cog.listener('on_raw_reaction_add')
         @commands.Cog.listener('on_raw_reaction_remove')
         """
+        self.message_cache.apply_reaction_event(payload)
         event_is_not_relevant, obj_tuple = await self._event_is_not_relevant(payload)
         if event_is_not_relevant:
             return
 
         emoji_clicked, channel, message, reaction, member, ims = obj_tuple
-        cog_name, menu, transitions = self.get_menu_entry_attributes(ims)
-        reaction_filters = self.get_reaction_filters(ims)
-        if not (await menu.should_respond(message, reaction, reaction_filters, member)):
+        menu_entry = self.get_menu_entry(ims)
+        if self._overrides('get_reaction_filters'):
+            reaction_filters = ReactionFilterPipeline(
+                list(self.get_reaction_filters(ImsView(ims))) + self.reaction_filters)
+        else:
+            reaction_filters = menu_entry.reaction_pipeline(self.bot.user.id, self._reaction_filters_key)
+            if self._overrides('get_additional_reaction_filters'):
+                reaction_filters = reaction_filters.extend(self.get_additional_reaction_filters(ImsView(ims)))
+        if not (await menu_entry.menu.should_respond(message, reaction, reaction_filters, member)):
             return
 
         try:
-            data = await self.get_menu_context(ims)
+            data = await self._get_menu_context(menu_entry, ImsView(ims))
         except CogNotLoaded:
             return
 
@@ -113,50 +173,179 @@ class MenuListener:
             'reaction': emoji_clicked
         })
 
-        await menu.transition(message, deepcopy(ims), emoji_clicked, member, **data)
-        await self.listener_respond_with_child(deepcopy(ims), message, emoji_clicked, member)
+        await self._run_click(message, _Click(emoji_clicked, member, ims, data))
+
+    async def _run_click(self, message: discord.Message, click: _Click) -> None:
+        """
+        Transitions for a message run one at a time, so each one starts from the state the previous one left.
+        Clicks that arrive while a transition is running are queued, and runs of foldable clicks are applied
+        together with a single edit. A transition that fails is logged, and the clicks queued behind it carry on
+        from the state it started from.
+        """
+        queue = self._pending_clicks.get(message.id)
+        if queue is not None:
+            queue.append(click)
+            return
+
+        queue = self._pending_clicks[message.id] = deque([click])
+        try:
+            ims = click.ims
+            while queue:
+                # earlier transitions replace the cached message with the edited one
+                message = self.message_cache.get(message.id) or message
+                clicks = [queue.popleft()]
+                menu_entry = self.get_menu_entry(ims)
+                menu = menu_entry.menu
+                foldable = menu_entry.foldable_emoji_names
+                # folding skips the per-click child updates, so menus with children run every click
+                if clicks[0].emoji_clicked in foldable and not ims.get('child_message_id'):
+                    while queue and queue[0].emoji_clicked in foldable:
+                        clicks.append(queue.popleft())
 
-    async def listener_respond_with_child(self, menu_1_ims, message_1, emoji_clicked, member):
-        failsafe = 0
-
-        while menu_1_ims.get('child_message_id'):
-            if failsafe == 10:
-                break
-            failsafe += 1
-            _, _, transitions_1 = self.get_menu_entry_attributes(menu_1_ims)
-            child_data_func = transitions_1.get_child_data_func(emoji_clicked)
-            try:
-                data = await self.get_menu_context(menu_1_ims)
-            except CogNotLoaded:
-                return
-            emoji_simulated_clicked_2, extra_ims = None, {}
-            if child_data_func is not None:
-                emoji_simulated_clicked_2, extra_ims = await child_data_func(menu_1_ims, emoji_clicked, **data)
-            if emoji_simulated_clicked_2 is not None:
-                fctx = await self.bot.get_context(message_1)
                 try:
-                    message_2 = await fctx.fetch_message(int(menu_1_ims['child_message_id']))
-                    menu_2_ims = message_2.embeds and IntraMessageState.extract_data(message_2.embeds[0])
-                    menu_2_ims.update(extra_ims)
-                    _, menu_2, _ = self.get_menu_entry_attributes(menu_2_ims)
-                    await menu_2.transition(message_2, menu_2_ims, emoji_simulated_clicked_2, member, **data)
+                    if len(clicks) == 1:
+                        click = clicks[0]
+                        new_control = await menu.transition(message, ImsView(ims), click.emoji_clicked,
+                                                            click.member, **click.data)
+                        await self.listener_respond_with_child(ImsView(ims), message, click.emoji_clicked,
+                                                               click.member)
+                    else:
+                        new_control = await menu.transition_folded(message, ImsView(ims),
+                                                                   [(c.emoji_clicked, c.member) for c in clicks],
+                                                                   **clicks[0].data)
                 except discord.errors.NotFound:
+                    raise
+                except Exception:
+                    # the clicks queued behind a failed transition still run, from the state it started from
+                    logger.exception('Transition of message %s failed', message.id)
+                    continue
+                if new_control is not None:
+                    ims = await IntraMessageState.resolve(new_control.extract_ims())
+                if not ims:
+                    # the menu replaced itself with something that isn't a menu
                     break
-                menu_1_ims = menu_2_ims
-                message_1 = message_2
+        except discord.errors.NotFound:
+            # the message was deleted by one of the transitions
+            pass
+        finally:
+            del self._pending_clicks[message.id]
+
+    async def listener_respond_with_child(self, menu_1_ims, message_1, emoji_clicked, member):
+        """
+        Pass a click on to the menu's child menus, and from them on to their own children. `child_message_id` in
+        the IMS may be a single message id or a list of them. The children of one menu are updated concurrently,
+        at most `child_concurrency` at a time, and every message is updated at most once per click.
+        """
+        visited = {message_1.id}
+        semaphore = asyncio.Semaphore(self.child_concurrency)
+        parents = [(menu_1_ims, message_1)]
+        while parents:
+            children = await asyncio.gather(*(
+                self._respond_with_children(parent_ims, parent_message, emoji_clicked, member, visited, semaphore)
+                for parent_ims, parent_message in parents))
+            parents = [child for parent_children in children for child in parent_children]
+
+    async def _respond_with_children(self, menu_1_ims, message_1, emoji_clicked, member, visited: Set[int],
+                                     semaphore: asyncio.Semaphore) -> List[Tuple[ImsView, discord.Message]]:
+        child_message_ids = self._child_message_ids(menu_1_ims)
+        if not child_message_ids:
+            return []
+        menu_entry_1 = self.get_menu_entry(menu_1_ims)
+        child_data_func = menu_entry_1.transitions.get_child_data_func(emoji_clicked)
+        if child_data_func is None:
+            return []
+        try:
+            data = await self._get_menu_context(menu_entry_1, menu_1_ims)
+        except CogNotLoaded:
+            return []
+        emoji_simulated_clicked_2, extra_ims = await child_data_func(menu_1_ims, emoji_clicked, **data)
+        if emoji_simulated_clicked_2 is None:
+            return []
+
+        # ids are marked before awaiting so that menus sharing a child don't both update it
+        child_message_ids = [i for i in child_message_ids if i not in visited]
+        visited.update(child_message_ids)
+        children = await asyncio.gather(*(
+            self._transition_child(message_1.channel, message_id, emoji_simulated_clicked_2, extra_ims, member,
+                                   semaphore, data)
+            for message_id in child_message_ids))
+        return [child for child in children if child is not None]
+
+    async def _transition_child(self, channel, message_id: int, emoji_simulated_clicked: str, extra_ims: dict,
+                                member, semaphore: asyncio.Semaphore, data: dict) \
+            -> Optional[Tuple[ImsView, discord.Message]]:
+        async with semaphore:
+            try:
+                message_2 = await self._get_message(channel, message_id)
+                cached_ims = await self._get_ims(message_2)
+                if not cached_ims:
+                    return None
+                menu_2_ims = ImsView(cached_ims)
+                menu_2_ims.update(extra_ims)
+                menu_2 = self.get_menu_entry(menu_2_ims).menu
+                await menu_2.transition(message_2, menu_2_ims, emoji_simulated_clicked, member, **data)
+            except discord.errors.NotFound:
+                return None
+        return menu_2_ims, message_2
+
+    @staticmethod
+    def _child_message_ids(ims) -> List[int]:
+        child_message_id = ims.get('child_message_id')
+        if not child_message_id:
+            return []
+        if isinstance(child_message_id, list):
+            return [int(i) for i in child_message_id]
+        return [int(child_message_id)]
+
+    async def _get_ims(self, message: discord.Message) -> Optional[Mapping[str, Any]]:
+        """Return the message's IMS as a read-only mapping, decoding it only once per edit of the message."""
+        if not message.embeds:
+            return None
+        ims = self.ims_cache.get(message.id, message.edited_at)
+        if ims is not None:
+            return ims
+
+        ims = IntraMessageState.extract_data(message.embeds[0])
+        if not ims:
+            return None
+        try:
+            ims = await IntraMessageState.resolve(ims)
+        except ImsStateNotFound:
+            return await self.get_missing_ims_fallback(message, ims)
+        return self.ims_cache.put(message.id, message.edited_at, ims)
+
+    async def get_missing_ims_fallback(self, message: discord.Message, ims: dict) -> Optional[dict]:
+        """
+        User should override this if menus whose stored IMS has been evicted should still respond,
+        e.g. by returning a fresh state. Returning None ignores the reaction. `ims` is the placeholder read from
+        the message, holding only the key of the missing state along with anything carried inline.
+        """
+        return None
+
+    @property
+    def reaction_filters(self) -> ReactionFilterList:
+        return self._reaction_filters
+
+    @reaction_filters.setter
+    def reaction_filters(self, reaction_filters: ReactionFilterList) -> None:
+        # the pipelines are cached per set of filters, so assign a new list rather than modifying this one in place
+        self._reaction_filters = reaction_filters
+        self._reaction_filters_key = tuple(reaction_filters)
+        self._payload_pipeline = None
+
+    def _get_payload_pipeline(self) -> ReactionFilterPipeline:
+        # built on first use because the bot's user isn't known until it has logged in
+        if self._payload_pipeline is None:
+            self._payload_pipeline = ReactionFilterPipeline(
+                [NotPosterEmojiReactionFilter(poster_id=self.bot.user.id)] + list(self._reaction_filters_key))
+        return self._payload_pipeline
 
     def get_reaction_filters(self, ims: dict):
         """
         User should override this if they want to change the existing filters
         """
-        cog_name, menu, transitions = self.get_menu_entry_attributes(ims)
-        reaction_filters = [
-            ValidEmojiReactionFilter(transitions.all_emoji_names()),
-            NotPosterEmojiReactionFilter(),
-            BotAuthoredMessageReactionFilter(self.bot.user.id),
-        ]
-        additional_filters = self.get_additional_reaction_filters(ims)
-        return reaction_filters + additional_filters
+        menu_entry = self.get_menu_entry(ims)
+        return menu_entry.default_reaction_filters(self.bot.user.id) + self.get_additional_reaction_filters(ims)
 
     def get_additional_reaction_filters(self, ims: dict):
         """
@@ -165,8 +354,14 @@ class MenuListener:
         return []
 
     async def get_menu_context(self, ims):
-        cog_name, _, _ = self.get_menu_entry_attributes(ims)
+        return await self._menu_context_for_cog(self.get_menu_entry(ims).cog_name, ims)
 
+    async def _get_menu_context(self, menu_entry: MenuMapEntry, ims):
+        if self._overrides('get_menu_context'):
+            return await self.get_menu_context(ims)
+        return await self._menu_context_for_cog(menu_entry.cog_name, ims)
+
+    async def _menu_context_for_cog(self, cog_name: Optional[str], ims):
         if not cog_name:
             return {}
 
@@ -178,11 +373,19 @@ class MenuListener:
         if hasattr(cog, "get_menu_context"):
             return await cog.get_menu_context(ims)
 
-    def get_menu_entry_attributes(self, ims):
+    def get_menu_entry(self, ims) -> MenuMapEntry:
         menu_type = ims.get('menu_type')
         if menu_type is None:
             raise MissingImsMenuType("Missing IMS menu type")
-        if menu_type not in self.menu_map:
+        menu_entry = self.menu_map.get(menu_type)
+        if menu_entry is None:
             raise InvalidImsMenuType(f"Menu type {menu_type} not specified in menu map")
-        menu_entry = self.menu_map[menu_type]
-        return menu_entry.cog_name, menu_entry.menuable.menu(), menu_entry.transitions
+        return menu_entry
+
+    def get_menu_entry_attributes(self, ims):
+        menu_entry = self.get_menu_entry(ims)
+        return menu_entry.cog_name, menu_entry.menu, menu_entry.transitions
+
+    def _overrides(self, method_name: str) -> bool:
+        # hooks that a subclass hasn't overridden can use the already resolved menu entry
+        return getattr(type(self), method_name) is not getattr(MenuListener, method_name)
@@ -1,10 +1,18 @@
 import json
-from collections import UserDict
+from collections import UserDict, OrderedDict
 from dataclasses import dataclass
-from typing import Optional, Type, Union
+from functools import cached_property
+from types import MappingProxyType
+from typing import Optional, Type, Union, Mapping, FrozenSet, Dict, Set, List, Tuple
 
+from discordmenu.embed.menu import EmbedMenu
 from discordmenu.embed.transitions import EmbedTransitions
 from discordmenu.menu.base import PMenuable, PMenuableCM
+from discordmenu.reaction_filter import ReactionFilter, ValidEmojiReactionFilter, NotPosterEmojiReactionFilter, \
+    BotAuthoredMessageReactionFilter, ReactionFilterPipeline
+
+# how many extended pipelines an entry keeps; listeners only swap their filters occasionally
+REACTION_PIPELINE_CACHE_SIZE = 8
 
 
 @dataclass
@@ -13,6 +21,63 @@ class MenuMapEntry:
     transitions: Type[EmbedTransitions]
     cog_name: Optional[str] = None
 
+    # Everything below is derived from the fields above on first use and kept for the life of the entry.
+    # Call `invalidate` if the menuable or the transitions' DATA is modified in place.
+
+    @cached_property
+    def menu(self) -> EmbedMenu:
+        return self.menuable.menu()
+
+    @cached_property
+    def emoji_names(self) -> FrozenSet[str]:
+        return frozenset(self.transitions.all_emoji_names())
+
+    @cached_property
+    def foldable_emoji_names(self) -> FrozenSet[str]:
+        return frozenset(e for e in self.emoji_names if self.transitions.is_foldable(e))
+
+    def default_reaction_filters(self, bot_id: int) -> List[ReactionFilter]:
+        return list(self.default_reaction_pipeline(bot_id).filters)
+
+    def default_reaction_pipeline(self, bot_id: int) -> ReactionFilterPipeline:
+        pipeline = self._default_reaction_pipelines.get(bot_id)
+        if pipeline is None:
+            pipeline = self._default_reaction_pipelines[bot_id] = ReactionFilterPipeline([
+                ValidEmojiReactionFilter(self.emoji_names),
+                NotPosterEmojiReactionFilter(),
+                BotAuthoredMessageReactionFilter(bot_id),
+            ])
+        return pipeline
+
+    def reaction_pipeline(self, bot_id: int, extra_filters: Tuple[ReactionFilter, ...]) -> ReactionFilterPipeline:
+        """
+        The default pipeline extended with `extra_filters`, built once per set of extra filters. Only the most
+        recently used REACTION_PIPELINE_CACHE_SIZE pipelines are kept.
+        """
+        key = (bot_id, extra_filters)
+        pipelines = self._reaction_pipelines
+        pipeline = pipelines.get(key)
+        if pipeline is None:
+            pipeline = pipelines[key] = self.default_reaction_pipeline(bot_id).extend(extra_filters)
+            while len(pipelines) > REACTION_PIPELINE_CACHE_SIZE:
+                pipelines.popitem(last=False)
+        else:
+            pipelines.move_to_end(key)
+        return pipeline
+
+    @cached_property
+    def _default_reaction_pipelines(self) -> Dict[int, ReactionFilterPipeline]:
+        return {}
+
+    @cached_property
+    def _reaction_pipelines(self) -> "OrderedDict[Tuple[int, Tuple[ReactionFilter, ...]], ReactionFilterPipeline]":
+        return OrderedDict()
+
+    def invalidate(self) -> None:
+        for attr in ('menu', 'emoji_names', 'foldable_emoji_names', '_default_reaction_pipelines',
+                     '_reaction_pipelines'):
+            self.__dict__.pop(attr, None)
+
     def __repr__(self):
         return json.dumps({
             'menuable': str(self.menuable),
@@ -23,7 +88,38 @@ class MenuMapEntry:
 
 class MenuMap(UserDict[str, MenuMapEntry]):
     def __init__(self, val=None):
+        self._emoji_index: Optional[Mapping[str, FrozenSet[str]]] = None
         super().__init__(val)
 
+    def __setitem__(self, key: str, value: MenuMapEntry) -> None:
+        super().__setitem__(key, value)
+        self._emoji_index = None
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self._emoji_index = None
+
     def __repr__(self):
         return json.dumps(self.data)
+
+    def emoji_index(self) -> Mapping[str, FrozenSet[str]]:
+        """
+        Map every valid emoji name (including fallbacks) to the menu types that respond to it.
+        The index is built lazily and rebuilt after entries are added or removed.
+        """
+        if self._emoji_index is None:
+            index: Dict[str, Set[str]] = {}
+            for menu_type, menu_entry in self.data.items():
+                for emoji_name in menu_entry.transitions.all_emoji_names():
+                    index.setdefault(emoji_name, set()).add(menu_type)
+            self._emoji_index = MappingProxyType({k: frozenset(v) for k, v in index.items()})
+        return self._emoji_index
+
+    def invalidate_emoji_index(self) -> None:
+        """
+        Call this if an EmbedTransitions.DATA already in the map is modified in place.
+        This also drops what each entry has cached.
+        """
+        self._emoji_index = None
+        for menu_entry in self.data.values():
+            menu_entry.invalidate()
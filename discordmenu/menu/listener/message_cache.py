@@ -0,0 +1,103 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from discord import Message, RawReactionActionEvent, Reaction
+from discord.utils import find
+
+
+class MessageCache:
+    """
+    Menu messages keyed by id, so the listener can find them without scanning discord.py's message cache or
+    fetching them. Entries expire `ttl` seconds after they were stored, and the least recently used entries are
+    evicted beyond `max_size`. Messages the listener had to fetch are only kept for `fetched_ttl` seconds, long
+    enough to serve a burst of reactions on the same message.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 3600, fetched_ttl: Optional[float] = 30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.fetched_ttl = fetched_ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._data: "OrderedDict[int, Tuple[Message, Optional[float]]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, message_id: int) -> Optional[Message]:
+        entry = self._data.get(message_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        message, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[message_id]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(message_id)
+        return message
+
+    def put(self, message: Message, ttl: Optional[float] = None, replace: bool = True) -> None:
+        """
+        Store a message, replacing any older copy unless `replace` is False.
+        `ttl` overrides the cache's ttl for this entry.
+        """
+        if not replace and self._is_live(message.id):
+            return
+        ttl = self.ttl if ttl is None else ttl
+        self._data[message.id] = (message, time.monotonic() + ttl if ttl is not None else None)
+        self._data.move_to_end(message.id)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def _is_live(self, message_id: int) -> bool:
+        entry = self._data.get(message_id)
+        return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    def discard(self, message_id: int) -> None:
+        self._data.pop(message_id, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def apply_reaction_event(self, payload: RawReactionActionEvent) -> None:
+        """
+        Keep a cached message's reactions in step with a raw reaction event, as discord.py does for the
+        messages in its own cache. Only public Message and Reaction attributes are used, so this doesn't depend
+        on how a given discord.py version tracks reactions internally.
+        """
+        entry = self._data.get(payload.message_id)
+        if entry is None:
+            return
+        message = entry[0]
+        emoji = payload.emoji.name if payload.emoji.is_unicode_emoji() else payload.emoji
+        # the cache only holds menus, which the bot posted
+        is_me = payload.user_id == message.author.id
+        reaction = find(lambda r: r.emoji == emoji, message.reactions)
+        if payload.event_type == 'REACTION_ADD':
+            if reaction is None:
+                message.reactions.append(Reaction(message=message, data={'count': 1, 'me': is_me}, emoji=emoji))
+            else:
+                reaction.count += 1
+                reaction.me = reaction.me or is_me
+        elif reaction is not None:
+            # otherwise the reaction was added before the message was cached
+            reaction.count -= 1
+            if is_me:
+                reaction.me = False
+            if reaction.count <= 0:
+                message.reactions.remove(reaction)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
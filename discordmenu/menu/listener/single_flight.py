@@ -0,0 +1,41 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one in-flight call instead of each making their own.
+    A caller that is cancelled doesn't cancel the call for the others.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        future = self._in_flight.get(key)
+        if future is None:
+            future = self._in_flight[key] = asyncio.ensure_future(func())
+            future.add_done_callback(lambda f: self._done(key, f))
+            self.calls += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+    def _done(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        if not future.cancelled():
+            # the callers that are still waiting get the exception through the shield; this keeps asyncio from
+            # logging it as never retrieved if they have all been cancelled
+            future.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': len(self._in_flight),
+            'calls': self.calls,
+            'shared': self.shared,
+        }
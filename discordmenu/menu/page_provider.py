@@ -0,0 +1,275 @@
+import asyncio
+import json
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, MutableMapping, Optional, Protocol, Sequence, Tuple, Union
+
+from discordmenu.embed.offload import view_offloader
+from discordmenu.embed.prerender import is_speculative
+from discordmenu.embed.view import EmbedView
+from discordmenu.embed.view_state import ViewState
+
+logger = logging.getLogger('discordmenu.page_provider')
+
+
+class PageProvider(Protocol):
+    """
+    Serves the pages of a ScrollableMenu or the tabs of a TabbedMenu. Only the page being shown is asked for, so a
+    provider over a large query result can fetch just the rows of that page.
+    """
+
+    async def get_page(self, state: ViewState, index: int) -> EmbedView:
+        ...
+
+    async def page_count(self, state: ViewState) -> int:
+        ...
+
+
+class ViewListProvider:
+    """Serves a sequence of view functions, e.g. a list of EmbedView classes or an EmbedPaginator."""
+
+    def __init__(self, views: Sequence[Callable[[ViewState], EmbedView]]):
+        self.views = views
+
+    async def get_page(self, state: ViewState, index: int) -> EmbedView:
+        return await view_offloader.render(self.views[index], state)
+
+    async def page_count(self, state: ViewState) -> int:
+        return len(self.views)
+
+
+class _Registration:
+    def __init__(self, provider: PageProvider, ttl: Optional[float], weak: bool, prefetch: int):
+        self._provider: Union[PageProvider, weakref.ref] = weakref.ref(provider) if weak else provider
+        self.weak = weak
+        self.ttl = ttl
+        self.prefetch = prefetch
+        self.expires_at = None
+        self.touch()
+        # pages being built or built ahead of time, keyed by index and state
+        self.prefetched: "OrderedDict[Tuple[int, str], asyncio.Future]" = OrderedDict()
+
+    @property
+    def provider(self) -> Optional[PageProvider]:
+        return self._provider() if self.weak else self._provider
+
+    def touch(self) -> None:
+        if self.ttl is not None:
+            self.expires_at = time.monotonic() + self.ttl
+
+    def is_live(self, now: float) -> bool:
+        return (self.expires_at is None or self.expires_at > now) and self.provider is not None
+
+
+class PageProviderRegistry:
+    """
+    Page providers by menu id. A registration can expire `ttl` seconds after the menu was last used, or only hold
+    its provider weakly, so that menus built for one query don't stay in memory forever. A menu whose provider is
+    gone stops responding.
+
+    With `prefetch`, that many pages either side of the one shown are built in the background, and used if the
+    next page asked for has the same state.
+    """
+
+    def __init__(self, sweep_interval: float = 60):
+        self.sweep_interval = sweep_interval
+        self._registrations: Dict[str, _Registration] = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+
+    def __contains__(self, menu_id: str) -> bool:
+        return self._get_registration(menu_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._registrations)
+
+    def register(self, menu_id: str, provider: PageProvider, ttl: Optional[float] = None, weak: bool = False,
+                 prefetch: int = 0) -> None:
+        self._sweep()
+        self.discard(menu_id)
+        self._registrations[menu_id] = _Registration(provider, ttl, weak, prefetch)
+
+    def discard(self, menu_id: str) -> None:
+        registration = self._registrations.pop(menu_id, None)
+        if registration is not None:
+            for future in registration.prefetched.values():
+                future.cancel()
+
+    def get(self, menu_id: str) -> PageProvider:
+        """Raises KeyError if nothing is registered for the menu id, or if its registration has expired."""
+        registration = self._get_registration(menu_id)
+        if registration is None:
+            raise KeyError(menu_id)
+        return registration.provider
+
+    async def get_page(self, menu_id: str, state: ViewState, index: int) -> EmbedView:
+        registration = self._get_registration(menu_id)
+        if registration is None:
+            raise KeyError(menu_id)
+        future = registration.prefetched.pop(_page_key(index, state), None)
+        if future is not None and not future.cancelled():
+            try:
+                view = await future
+            except Exception:
+                # the prefetch failed, see _retrieve_exception; the page is built again like any other miss
+                pass
+            else:
+                self.prefetch_hits += 1
+                return view
+        if registration.prefetch:
+            self.prefetch_misses += 1
+        return await registration.provider.get_page(state, index)
+
+    async def page_count(self, menu_id: str, state: ViewState) -> int:
+        registration = self._get_registration(menu_id)
+        if registration is None:
+            raise KeyError(menu_id)
+        return await registration.provider.page_count(state)
+
+    def prefetch(self, menu_id: str, index: int, page_count: int, state_for: Callable[[int], ViewState]) -> None:
+        """
+        Start building the pages around `index`, wrapping around at `page_count`, if the menu was registered with
+        `prefetch`. `state_for` gives the state a page will be shown with. Pages built ahead of a click don't
+        prefetch around themselves.
+        """
+        registration = self._get_registration(menu_id)
+        if registration is None or not registration.prefetch or page_count < 2 or is_speculative():
+            return
+        provider = registration.provider
+        indices = dict.fromkeys(
+            (index + step * offset) % page_count
+            for offset in range(1, registration.prefetch + 1)
+            for step in (1, -1))
+        indices.pop(index, None)
+        for page_index in indices:
+            state = state_for(page_index)
+            key = _page_key(page_index, state)
+            if key in registration.prefetched:
+                registration.prefetched.move_to_end(key)
+                continue
+            future = asyncio.ensure_future(provider.get_page(state, page_index))
+            future.add_done_callback(_retrieve_exception)
+            registration.prefetched[key] = future
+        while len(registration.prefetched) > 2 * registration.prefetch:
+            _, future = registration.prefetched.popitem(last=False)
+            future.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'registrations': len(self._registrations),
+            'prefetch_hits': self.prefetch_hits,
+            'prefetch_misses': self.prefetch_misses,
+        }
+
+    def _get_registration(self, menu_id: str) -> Optional[_Registration]:
+        registration = self._registrations.get(menu_id)
+        if registration is None:
+            return None
+        if not registration.is_live(time.monotonic()):
+            self.discard(menu_id)
+            return None
+        registration.touch()
+        return registration
+
+    def _sweep(self) -> None:
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        for menu_id in [k for k, r in self._registrations.items() if not r.is_live(now)]:
+            self.discard(menu_id)
+
+
+class _ViewLists(MutableMapping[str, Sequence[Callable[[ViewState], EmbedView]]]):
+    """The menus of a registry that were set with a list of views, as the `DATA` dict that used to hold them."""
+
+    def __init__(self, registry: PageProviderRegistry):
+        self._registry = registry
+
+    def __getitem__(self, menu_id: str) -> Sequence[Callable[[ViewState], EmbedView]]:
+        provider = self._registry.get(menu_id)
+        if not isinstance(provider, ViewListProvider):
+            raise KeyError(menu_id)
+        return provider.views
+
+    def __setitem__(self, menu_id: str, views: Sequence[Callable[[ViewState], EmbedView]]) -> None:
+        self._registry.register(menu_id, ViewListProvider(views))
+
+    def __delitem__(self, menu_id: str) -> None:
+        if menu_id not in self:
+            raise KeyError(menu_id)
+        self._registry.discard(menu_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([menu_id for menu_id in list(self._registry._registrations) if menu_id in self])
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class _ViewListsOf:
+    def __get__(self, instance: Any, owner: type) -> _ViewLists:
+        return _ViewLists(owner.PROVIDERS)
+
+
+class PageViews:
+    """
+    Base for the registries of menus that show one of several views, like ScrollableViews and TabbedViews.
+    Subclasses need their own PROVIDERS. `DATA` is kept for code written before page providers, and maps each
+    menu id that was set with a list of views to that list.
+    """
+    PROVIDERS: PageProviderRegistry
+    DATA = _ViewListsOf()
+
+    @classmethod
+    def set(cls, menu_id: str, views: Union[Sequence[Callable], Callable]) -> None:
+        """
+        `views` can be any sequence of views, e.g. an EmbedPaginator, so that only the view of the page being
+        shown is built. Use `register` for pages that are loaded asynchronously, or to let the views expire.
+        """
+        cls.PROVIDERS.register(menu_id, ViewListProvider([views] if callable(views) else views))
+
+    @classmethod
+    def register(cls, menu_id: str, provider: PageProvider, ttl: Optional[float] = None, weak: bool = False,
+                 prefetch: int = 0) -> None:
+        cls.PROVIDERS.register(menu_id, provider, ttl=ttl, weak=weak, prefetch=prefetch)
+
+    @classmethod
+    def discard(cls, menu_id: str) -> None:
+        cls.PROVIDERS.discard(menu_id)
+
+    @classmethod
+    def view(cls, menu_id: str, idx: int) -> Callable[[ViewState], EmbedView]:
+        return cls._view_list(menu_id).views[idx]
+
+    @classmethod
+    def view_count(cls, menu_id: str) -> int:
+        return len(cls._view_list(menu_id).views)
+
+    @classmethod
+    async def get_page(cls, menu_id: str, state: ViewState, index: int) -> EmbedView:
+        return await cls.PROVIDERS.get_page(menu_id, state, index)
+
+    @classmethod
+    async def page_count(cls, menu_id: str, state: ViewState) -> int:
+        return await cls.PROVIDERS.page_count(menu_id, state)
+
+    @classmethod
+    def _view_list(cls, menu_id: str) -> ViewListProvider:
+        provider = cls.PROVIDERS.get(menu_id)
+        if not isinstance(provider, ViewListProvider):
+            raise TypeError("Menu {} was registered with a page provider, use get_page instead".format(menu_id))
+        return provider
+
+
+def _page_key(index: int, state: ViewState) -> Tuple[int, str]:
+    return index, json.dumps(state.serialize(), sort_keys=True, default=str)
+
+
+def _retrieve_exception(future: asyncio.Future) -> None:
+    # a prefetch that fails is retried when the page is asked for, so its error isn't interesting on its own
+    if not future.cancelled() and future.exception() is not None:
+        logger.debug('Prefetching a page failed', exc_info=future.exception())
@@ -1,15 +1,20 @@
-from typing import Any, Dict, Callable, Union, List
+from copy import copy
+from typing import Any, Dict
 from typing import Optional
 
 from discord import Message
 
 from discordmenu.embed.emoji import EmojiRef
 from discordmenu.embed.menu import EmbedMenu
+from discordmenu.embed.paginator import EmbedPaginator
 from discordmenu.embed.transitions import EmbedTransitions, EmbedTransition
 from discordmenu.embed.view import EmbedView
+from discordmenu.embed.view_cache import view_cache
 from discordmenu.embed.view_state import ViewState
 from discordmenu.embed.wrapper import EmbedWrapper
 from discordmenu.menu.base import PMenuable
+from discordmenu.menu.footer import embed_footer_with_state
+from discordmenu.menu.page_provider import PageViews, PageProviderRegistry
 
 
 class ScrollableViewState(ViewState):
@@ -39,68 +44,93 @@ class ScrollableViewState(ViewState):
                    ims.get('current_pane_num'), ims.get('num_pages'), extra_state=ims)
 
 
-class ScrollableViews:
-    DATA: Dict[str, List[Callable[[ScrollableViewState], EmbedView]]] = {}
+class ScrollableViews(PageViews):
+    PROVIDERS = PageProviderRegistry()
 
     @classmethod
-    def set(cls, menu_id: str, views: Union[List[Callable], Callable]) -> None:
-        if type(views) is list:
-            cls.DATA[menu_id] = views
-        else:
-            cls.DATA[menu_id] = [views]
-
-    @classmethod
-    def view(cls, menu_id: str, idx: int) -> Callable[[ScrollableViewState], EmbedView]:
-        return cls.DATA[menu_id][idx]
-
-    @classmethod
-    def view_count(cls, menu_id: str):
-        return len(cls.DATA[menu_id])
+    def paginate(cls, menu_id: str, view: EmbedView, **kwargs) -> EmbedPaginator:
+        """
+        Split a view that is too big for one embed into pages, and set them as the views of `menu_id`.
+        The number of pages for the view state is the length of the returned paginator.
+        """
+        paginator = EmbedPaginator(view, footer=embed_footer_with_state, **kwargs)
+        cls.set(menu_id, paginator)
+        return paginator
 
 
 class ScrollableMenu(PMenuable[ScrollableViewState]):
     MENU_TYPE = ScrollableViewState.MENU_TYPE
+    # build the panes the other buttons lead to in the background, see Prerenderer; set before the menu is built
+    PRERENDER = False
 
     @staticmethod
     def menu() -> EmbedMenu:
-        return EmbedMenu(ScrollableMenuTransitions.transitions(), ScrollableMenu.embed)
+        prerender_emojis = ScrollableMenuTransitions.foldable_emoji_names() if ScrollableMenu.PRERENDER else ()
+        return EmbedMenu(ScrollableMenuTransitions.transitions(), ScrollableMenu.embed_page,
+                         prerender_emojis=prerender_emojis)
 
     @staticmethod
-    async def respond_to_left(message: Optional[Message], ims, **data) -> EmbedWrapper:
-        state = await ScrollableViewState.deserialize(ims)
+    async def respond_to_left(message: Optional[Message], ims, **data) -> Optional[EmbedWrapper]:
+        return await ScrollableMenu._scroll(ims, -1)
 
-        next_pane_num = (state.current_pane_num - 1) % state.num_pages
-        state.prev_pane_num = state.current_pane_num
-        state.current_pane_num = next_pane_num
-
-        return ScrollableMenu.embed(state)
+    @staticmethod
+    async def respond_to_right(message: Optional[Message], ims, **data) -> Optional[EmbedWrapper]:
+        return await ScrollableMenu._scroll(ims, 1)
 
     @staticmethod
-    async def respond_to_right(message: Optional[Message], ims, **data) -> EmbedWrapper:
+    async def _scroll(ims, step: int) -> Optional[EmbedWrapper]:
         state = await ScrollableViewState.deserialize(ims)
+        if state.menu_id not in ScrollableViews.PROVIDERS:
+            # the views have expired
+            return None
+        state.num_pages = await ScrollableViews.page_count(state.menu_id, state)
+        if not state.num_pages:
+            # nothing left to scroll to
+            return None
+        next_state = ScrollableMenu._moved_to(state, state.current_pane_num + step)
+        return await ScrollableMenu._embed_page(next_state, state.num_pages)
 
-        next_pane_num = (state.current_pane_num + 1) % state.num_pages
-        state.prev_pane_num = state.current_pane_num
-        state.current_pane_num = next_pane_num
-
-        return ScrollableMenu.embed(state)
+    @staticmethod
+    def _moved_to(state: ScrollableViewState, pane_num: int) -> ScrollableViewState:
+        next_state = copy(state)
+        next_state.prev_pane_num = state.current_pane_num
+        next_state.current_pane_num = pane_num % state.num_pages if state.num_pages else 0
+        return next_state
 
     @staticmethod
     def embed(state: ScrollableViewState) -> Optional[EmbedWrapper]:
+        """Only for views set as a sequence with ScrollableViews.set, see `embed_page`."""
         if state is None:
             return None
         emojis = ScrollableMenuTransitions.emoji_names()
         menu_id = state.menu_id
-        view = ScrollableViews.view(menu_id, state.current_pane_num)(state)
+        view = view_cache.render(ScrollableViews.view(menu_id, state.current_pane_num), state)
         n = ScrollableViews.view_count(menu_id)
         return EmbedWrapper(view, emojis[:n])
 
+    @staticmethod
+    async def embed_page(state: ScrollableViewState) -> Optional[EmbedWrapper]:
+        if state is None:
+            return None
+        return await ScrollableMenu._embed_page(state, await ScrollableViews.page_count(state.menu_id, state))
+
+    @staticmethod
+    async def _embed_page(state: ScrollableViewState, n: int) -> EmbedWrapper:
+        emojis = ScrollableMenuTransitions.emoji_names()
+        menu_id = state.menu_id
+        # the page count may have changed since the state was serialized
+        state.num_pages = n
+        view = await ScrollableViews.get_page(menu_id, state, state.current_pane_num)
+        ScrollableViews.PROVIDERS.prefetch(menu_id, state.current_pane_num, n,
+                                           lambda i: ScrollableMenu._moved_to(state, i))
+        return EmbedWrapper(view, emojis[:n])
+
 
 class ScrollableMenuTransitions(EmbedTransitions):
     left_arrow = '\N{BLACK LEFT-POINTING DOUBLE TRIANGLE}'
     right_arrow = '\N{BLACK RIGHT-POINTING DOUBLE TRIANGLE}'
 
     DATA: Dict[EmojiRef, EmbedTransition] = {
-        left_arrow: EmbedTransition(left_arrow, ScrollableMenu.respond_to_left),
-        right_arrow: EmbedTransition(right_arrow, ScrollableMenu.respond_to_right),
+        left_arrow: EmbedTransition(left_arrow, ScrollableMenu.respond_to_left, foldable=True),
+        right_arrow: EmbedTransition(right_arrow, ScrollableMenu.respond_to_right, foldable=True),
     }
@@ -8,6 +8,7 @@ from discordmenu.embed.emoji import EmojiRef
 from discordmenu.embed.menu import EmbedMenu
 from discordmenu.embed.transitions import EmbedTransitions, EmbedTransition
 from discordmenu.embed.view import EmbedView
+from discordmenu.embed.view_cache import view_cache
 from discordmenu.embed.view_state import ViewState
 from discordmenu.embed.wrapper import EmbedWrapper
 from discordmenu.intra_message_state import _IntraMessageState
@@ -42,6 +43,8 @@ class SimpleTabbedTextViewState(ViewState):
 
 
 class SimpleTabbedTextView(EmbedView):
+    VIEW_STATE_KEYS = ('messages', 'current_index')
+
     def __init__(self, state: SimpleTabbedTextViewState):
         super().__init__(
             EmbedMain(description=state.messages[state.current_index]),
@@ -72,7 +75,7 @@ class SimpleTabbedTextMenu(PMenuable[SimpleTabbedTextViewState]):
             return None
         emojis = SimpleTabbedTextMenuTransitions.emoji_names()
         n = len(state.messages)
-        return EmbedWrapper(SimpleTabbedTextView(state), emojis[:n])
+        return EmbedWrapper(view_cache.render(SimpleTabbedTextView, state), emojis[:n])
 
 
 def keycap(n: int):
@@ -83,13 +86,13 @@ def keycap(n: int):
 
 class SimpleTabbedTextMenuTransitions(EmbedTransitions):
     DATA: Dict[EmojiRef, EmbedTransition] = {
-        keycap(1): EmbedTransition(keycap(1), SimpleTabbedTextMenu.respond_to_n_emoji(1)),
-        keycap(2): EmbedTransition(keycap(2), SimpleTabbedTextMenu.respond_to_n_emoji(2)),
-        keycap(3): EmbedTransition(keycap(3), SimpleTabbedTextMenu.respond_to_n_emoji(3)),
-        keycap(4): EmbedTransition(keycap(4), SimpleTabbedTextMenu.respond_to_n_emoji(4)),
-        keycap(5): EmbedTransition(keycap(5), SimpleTabbedTextMenu.respond_to_n_emoji(5)),
-        keycap(6): EmbedTransition(keycap(6), SimpleTabbedTextMenu.respond_to_n_emoji(6)),
-        keycap(7): EmbedTransition(keycap(7), SimpleTabbedTextMenu.respond_to_n_emoji(7)),
-        keycap(8): EmbedTransition(keycap(8), SimpleTabbedTextMenu.respond_to_n_emoji(8)),
-        keycap(9): EmbedTransition(keycap(9), SimpleTabbedTextMenu.respond_to_n_emoji(9)),
+        keycap(1): EmbedTransition(keycap(1), SimpleTabbedTextMenu.respond_to_n_emoji(1), foldable=True),
+        keycap(2): EmbedTransition(keycap(2), SimpleTabbedTextMenu.respond_to_n_emoji(2), foldable=True),
+        keycap(3): EmbedTransition(keycap(3), SimpleTabbedTextMenu.respond_to_n_emoji(3), foldable=True),
+        keycap(4): EmbedTransition(keycap(4), SimpleTabbedTextMenu.respond_to_n_emoji(4), foldable=True),
+        keycap(5): EmbedTransition(keycap(5), SimpleTabbedTextMenu.respond_to_n_emoji(5), foldable=True),
+        keycap(6): EmbedTransition(keycap(6), SimpleTabbedTextMenu.respond_to_n_emoji(6), foldable=True),
+        keycap(7): EmbedTransition(keycap(7), SimpleTabbedTextMenu.respond_to_n_emoji(7), foldable=True),
+        keycap(8): EmbedTransition(keycap(8), SimpleTabbedTextMenu.respond_to_n_emoji(8), foldable=True),
+        keycap(9): EmbedTransition(keycap(9), SimpleTabbedTextMenu.respond_to_n_emoji(9), foldable=True),
     }
@@ -1,4 +1,5 @@
-from typing import Any, Dict, Coroutine, Callable, Union, List
+from copy import copy
+from typing import Any, Dict, Coroutine, Callable
 from typing import Optional
 
 from discord import Message
@@ -6,11 +7,12 @@ from discord import Message
 from discordmenu.embed.emoji import EmojiRef
 from discordmenu.embed.menu import EmbedMenu
 from discordmenu.embed.transitions import EmbedTransitions, EmbedTransition
-from discordmenu.embed.view import EmbedView
+from discordmenu.embed.view_cache import view_cache
 from discordmenu.embed.view_state import ViewState
 from discordmenu.embed.wrapper import EmbedWrapper
 from discordmenu.intra_message_state import _IntraMessageState
 from discordmenu.menu.base import PMenuable
+from discordmenu.menu.page_provider import PageViews, PageProviderRegistry
 
 
 class TabbedViewState(ViewState):
@@ -35,52 +37,61 @@ class TabbedViewState(ViewState):
                    extra_state=ims)
 
 
-class TabbedViews:
-    DATA: Dict[str, List[Callable[[TabbedViewState], EmbedView]]] = {}
-
-    @classmethod
-    def set(cls, menu_id: str, views: Union[List[Callable], Callable]) -> None:
-        if type(views) is list:
-            cls.DATA[menu_id] = views
-        else:
-            cls.DATA[menu_id] = [views]
-
-    @classmethod
-    def view(cls, menu_id: str, idx: int) -> Callable[[TabbedViewState], EmbedView]:
-        return cls.DATA[menu_id][idx]
-
-    @classmethod
-    def view_count(cls, menu_id: str):
-        return len(cls.DATA[menu_id])
+class TabbedViews(PageViews):
+    PROVIDERS = PageProviderRegistry()
 
 
 class TabbedMenu(PMenuable[TabbedViewState]):
     MENU_TYPE = TabbedViewState.MENU_TYPE
+    # build the panes the other buttons lead to in the background, see Prerenderer; set before the menu is built
+    PRERENDER = False
 
     @staticmethod
     def menu() -> EmbedMenu:
-        return EmbedMenu(TabbedMenuTransitions.transitions(), TabbedMenu.embed)
+        prerender_emojis = TabbedMenuTransitions.foldable_emoji_names() if TabbedMenu.PRERENDER else ()
+        return EmbedMenu(TabbedMenuTransitions.transitions(), TabbedMenu.embed_page,
+                         prerender_emojis=prerender_emojis)
 
     @staticmethod
     def respond_to_n_emoji(n: int) -> \
             Optional[Callable[[Optional[Message], _IntraMessageState, Any], Coroutine[None, None, EmbedWrapper]]]:
-        async def respond_to_n_inner(message: Optional[Message], ims, **data) -> EmbedWrapper:
+        async def respond_to_n_inner(message: Optional[Message], ims, **data) -> Optional[EmbedWrapper]:
             view_state = await TabbedViewState.deserialize(ims)
-            view_state.current_index = n - 1
-            return TabbedMenu.embed(view_state)
+            if view_state.menu_id not in TabbedViews.PROVIDERS:
+                # the views have expired
+                return None
+            return await TabbedMenu.embed_page(TabbedMenu._moved_to(view_state, n - 1))
 
         return respond_to_n_inner
 
+    @staticmethod
+    def _moved_to(state: TabbedViewState, index: int) -> TabbedViewState:
+        next_state = copy(state)
+        next_state.current_index = index
+        return next_state
+
     @staticmethod
     def embed(state: TabbedViewState) -> Optional[EmbedWrapper]:
+        """Only for views set as a sequence with TabbedViews.set, see `embed_page`."""
         if state is None:
             return None
         emojis = TabbedMenuTransitions.emoji_names()
         menu_id = state.menu_id
-        view = TabbedViews.view(menu_id, state.current_index)(state)
+        view = view_cache.render(TabbedViews.view(menu_id, state.current_index), state)
         n = TabbedViews.view_count(menu_id)
         return EmbedWrapper(view, emojis[:n])
 
+    @staticmethod
+    async def embed_page(state: TabbedViewState) -> Optional[EmbedWrapper]:
+        if state is None:
+            return None
+        emojis = TabbedMenuTransitions.emoji_names()
+        menu_id = state.menu_id
+        view = await TabbedViews.get_page(menu_id, state, state.current_index)
+        n = await TabbedViews.page_count(menu_id, state)
+        TabbedViews.PROVIDERS.prefetch(menu_id, state.current_index, n, lambda i: TabbedMenu._moved_to(state, i))
+        return EmbedWrapper(view, emojis[:n])
+
 
 def keycap(n: int):
     if n < 0 or n > 9:
@@ -90,13 +101,13 @@ def keycap(n: int):
 
 class TabbedMenuTransitions(EmbedTransitions):
     DATA: Dict[EmojiRef, EmbedTransition] = {
-        keycap(1): EmbedTransition(keycap(1), TabbedMenu.respond_to_n_emoji(1)),
-        keycap(2): EmbedTransition(keycap(2), TabbedMenu.respond_to_n_emoji(2)),
-        keycap(3): EmbedTransition(keycap(3), TabbedMenu.respond_to_n_emoji(3)),
-        keycap(4): EmbedTransition(keycap(4), TabbedMenu.respond_to_n_emoji(4)),
-        keycap(5): EmbedTransition(keycap(5), TabbedMenu.respond_to_n_emoji(5)),
-        keycap(6): EmbedTransition(keycap(6), TabbedMenu.respond_to_n_emoji(6)),
-        keycap(7): EmbedTransition(keycap(7), TabbedMenu.respond_to_n_emoji(7)),
-        keycap(8): EmbedTransition(keycap(8), TabbedMenu.respond_to_n_emoji(8)),
-        keycap(9): EmbedTransition(keycap(9), TabbedMenu.respond_to_n_emoji(9)),
+        keycap(1): EmbedTransition(keycap(1), TabbedMenu.respond_to_n_emoji(1), foldable=True),
+        keycap(2): EmbedTransition(keycap(2), TabbedMenu.respond_to_n_emoji(2), foldable=True),
+        keycap(3): EmbedTransition(keycap(3), TabbedMenu.respond_to_n_emoji(3), foldable=True),
+        keycap(4): EmbedTransition(keycap(4), TabbedMenu.respond_to_n_emoji(4), foldable=True),
+        keycap(5): EmbedTransition(keycap(5), TabbedMenu.respond_to_n_emoji(5), foldable=True),
+        keycap(6): EmbedTransition(keycap(6), TabbedMenu.respond_to_n_emoji(6), foldable=True),
+        keycap(7): EmbedTransition(keycap(7), TabbedMenu.respond_to_n_emoji(7), foldable=True),
+        keycap(8): EmbedTransition(keycap(8), TabbedMenu.respond_to_n_emoji(8), foldable=True),
+        keycap(9): EmbedTransition(keycap(9), TabbedMenu.respond_to_n_emoji(9), foldable=True),
     }
@@ -0,0 +1,99 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class EvictionPolicy:
+    """
+    Decides which message ids a MenuRegistry forgets. Entries are kept in insertion order with the
+    wall clock time they were recorded, so snapshots remain meaningful across restarts.
+    """
+
+    def record(self, entries: "OrderedDict[int, float]", message_id: int, now: float) -> None:
+        entries.pop(message_id, None)
+        entries[message_id] = now
+
+    def access(self, entries: "OrderedDict[int, float]", message_id: int, now: float) -> bool:
+        return message_id in entries
+
+    def evict(self, entries: "OrderedDict[int, float]", max_size: int, now: float) -> None:
+        while len(entries) > max_size:
+            entries.popitem(last=False)
+
+
+class LRUEvictionPolicy(EvictionPolicy):
+    """Forget the least recently reacted-to menus first."""
+
+    def access(self, entries: "OrderedDict[int, float]", message_id: int, now: float) -> bool:
+        if message_id not in entries:
+            return False
+        entries.move_to_end(message_id)
+        return True
+
+
+class TTLEvictionPolicy(EvictionPolicy):
+    """Forget menus a fixed number of seconds after they were last sent or updated."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    def access(self, entries: "OrderedDict[int, float]", message_id: int, now: float) -> bool:
+        recorded_at = entries.get(message_id)
+        if recorded_at is None:
+            return False
+        if now - recorded_at > self.ttl:
+            del entries[message_id]
+            return False
+        return True
+
+    def evict(self, entries: "OrderedDict[int, float]", max_size: int, now: float) -> None:
+        # entries are ordered by record time, so expired ones are always at the front
+        while entries and now - next(iter(entries.values())) > self.ttl:
+            entries.popitem(last=False)
+        super().evict(entries, max_size, now)
+
+
+class MenuRegistry:
+    """
+    A bounded set of message ids that are known to hold live menus.
+
+    Menus record themselves here when they are sent or updated and drop out when they are closed. A MenuListener
+    given a registry ignores reactions on any other message before doing any network I/O, so a registry
+    should only be handed to the listener once it is populated, e.g. after `restore` on startup.
+    """
+
+    def __init__(self, max_size: int = 10000, eviction_policy: Optional[EvictionPolicy] = None):
+        self.max_size = max_size
+        self.eviction_policy = eviction_policy or LRUEvictionPolicy()
+        self._entries: "OrderedDict[int, float]" = OrderedDict()
+
+    def __contains__(self, message_id: int) -> bool:
+        return self.eviction_policy.access(self._entries, message_id, time.time())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record(self, message_id: int) -> None:
+        now = time.time()
+        self.eviction_policy.record(self._entries, message_id, now)
+        self.eviction_policy.evict(self._entries, self.max_size, now)
+
+    def discard(self, message_id: int) -> None:
+        self._entries.pop(message_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON serializable copy of the registry that can be passed to `restore`."""
+        return {'entries': [[message_id, recorded_at] for message_id, recorded_at in self._entries.items()]}
+
+    def restore(self, snapshot: Dict[str, Any]) -> None:
+        merged = dict(self._entries)
+        for message_id, recorded_at in snapshot.get('entries', []):
+            merged[int(message_id)] = max(recorded_at, merged.get(int(message_id), recorded_at))
+        self._entries = OrderedDict(sorted(merged.items(), key=lambda item: item[1]))
+        self.eviction_policy.evict(self._entries, self.max_size, time.time())
+
+
+menu_registry = MenuRegistry()
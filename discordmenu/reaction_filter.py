@@ -1,4 +1,4 @@
-from typing import Iterable, Optional, List, Union
+from typing import Iterable, Optional, List, Union, Tuple
 
 from discord import Reaction, Message, Member, RawReactionActionEvent, Emoji
 
@@ -8,9 +8,32 @@ from discordmenu.emoji.emoji import discord_emoji_to_emoji_name
 
 
 class ReactionFilter:
+    """
+    Filters that can decide without awaiting anything should implement `_allow_reaction_sync` and
+    `_allow_reaction_raw_sync` instead of the async methods, so that a ReactionFilterPipeline can run them
+    before any filter that has to await. `cost` orders filters of the same kind in a pipeline, cheapest first.
+
+    Filters that can reject some events from the raw event payload alone should also implement `_allow_payload`,
+    which the listener runs before it fetches the message.
+    """
+    cost: int = 10
+
     def __init__(self, reaction_filter: Optional["ReactionFilter"] = None):
         self.inner_filter = reaction_filter
 
+    @property
+    def is_sync(self) -> bool:
+        """
+        True if neither this filter nor any filter nested in it overrides the async checks, public or private.
+        Filters that override them are run asynchronously.
+        """
+        cls = type(self)
+        own = (cls.allow_reaction is ReactionFilter.allow_reaction
+               and cls.allow_reaction_raw is ReactionFilter.allow_reaction_raw
+               and cls._allow_reaction is ReactionFilter._allow_reaction
+               and cls._allow_reaction_raw is ReactionFilter._allow_reaction_raw)
+        return own and (self.inner_filter is None or self.inner_filter.is_sync)
+
     async def allow_reaction(self, message: Message, reaction: Reaction, member: Member) -> bool:
         parent = await self._allow_reaction(message, reaction, member)
         if parent:
@@ -25,14 +48,97 @@ class ReactionFilter:
 
         return await self.inner_filter.allow_reaction_raw(message, reaction) if self.inner_filter else False
 
-    async def _allow_reaction(self, message: Message, reaction: Reaction, member: Member) -> bool:
+    def allow_payload(self, payload: RawReactionActionEvent) -> bool:
+        if self._allow_payload(payload):
+            return True
+        return self.inner_filter.allow_payload(payload) if self.inner_filter else False
+
+    def allow_reaction_sync(self, message: Message, reaction: Reaction, member: Member) -> bool:
+        """Only valid if `is_sync`."""
+        if self._allow_reaction_sync(message, reaction, member):
+            return True
+        return self.inner_filter.allow_reaction_sync(message, reaction, member) if self.inner_filter else False
+
+    def allow_reaction_raw_sync(self, message: Message, reaction: RawReactionActionEvent) -> bool:
+        """Only valid if `is_sync`."""
+        if self._allow_reaction_raw_sync(message, reaction):
+            return True
+        return self.inner_filter.allow_reaction_raw_sync(message, reaction) if self.inner_filter else False
+
+    def _allow_payload(self, payload: RawReactionActionEvent) -> bool:
+        """Return True unless the payload alone shows that the reaction will be rejected."""
         return True
 
+    async def _allow_reaction(self, message: Message, reaction: Reaction, member: Member) -> bool:
+        return self._allow_reaction_sync(message, reaction, member)
+
     async def _allow_reaction_raw(self, message: Message, reaction: RawReactionActionEvent) -> bool:
+        return self._allow_reaction_raw_sync(message, reaction)
+
+    def _allow_reaction_sync(self, message: Message, reaction: Reaction, member: Member) -> bool:
+        return True
+
+    def _allow_reaction_raw_sync(self, message: Message, reaction: RawReactionActionEvent) -> bool:
+        return True
+
+
+class ReactionFilterPipeline:
+    """
+    An AND of reaction filters, ordered once so that cheap synchronous filters run first and the first
+    rejection short circuits the rest. Build one per set of filters and reuse it across events.
+    """
+
+    def __init__(self, reaction_filters: Iterable[ReactionFilter]):
+        self.filters: Tuple[ReactionFilter, ...] = tuple(reaction_filters)
+        self.sync_filters = tuple(sorted((f for f in self.filters if f.is_sync), key=lambda f: f.cost))
+        self.async_filters = tuple(sorted((f for f in self.filters if not f.is_sync), key=lambda f: f.cost))
+
+    @staticmethod
+    def of(reaction_filters: Union["ReactionFilterPipeline", Iterable[ReactionFilter]]) -> "ReactionFilterPipeline":
+        if isinstance(reaction_filters, ReactionFilterPipeline):
+            return reaction_filters
+        return ReactionFilterPipeline(reaction_filters)
+
+    def extend(self, reaction_filters: Iterable[ReactionFilter]) -> "ReactionFilterPipeline":
+        reaction_filters = list(reaction_filters)
+        if not reaction_filters:
+            return self
+        return ReactionFilterPipeline(self.filters + tuple(reaction_filters))
+
+    def allow_payload(self, payload: RawReactionActionEvent) -> bool:
+        for reaction_filter in self.sync_filters + self.async_filters:
+            if not reaction_filter.allow_payload(payload):
+                return False
+        return True
+
+    async def allow_reaction(self, message: Message, reaction: Reaction, member: Member) -> bool:
+        for reaction_filter in self.sync_filters:
+            if not reaction_filter.allow_reaction_sync(message, reaction, member):
+                return False
+        for reaction_filter in self.async_filters:
+            if not await reaction_filter.allow_reaction(message, reaction, member):
+                return False
+        return True
+
+    async def allow_reaction_raw(self, message: Message, reaction: RawReactionActionEvent) -> bool:
+        for reaction_filter in self.sync_filters:
+            if not reaction_filter.allow_reaction_raw_sync(message, reaction):
+                return False
+        for reaction_filter in self.async_filters:
+            if not await reaction_filter.allow_reaction_raw(message, reaction):
+                return False
         return True
 
+    def __len__(self):
+        return len(self.filters)
+
+    def __iter__(self):
+        return iter(self.filters)
+
 
 class ValidEmojiReactionFilter(ReactionFilter):
+    cost = 1
+
     def __init__(self, valid_emoji_names: Iterable[Union[str, Emoji]],
                  default_emoji_override: List[EmojiRef] = None,
                  filters: Optional[ReactionFilter] = None):
@@ -40,13 +146,16 @@ class ValidEmojiReactionFilter(ReactionFilter):
         default_emojis = default_emoji_override or DEFAULT_EMOJI_LIST
         emoji_set = set(default_emojis)
         emoji_set.update(valid_emoji_names)
-        self.valid_emoji_names = list(emoji_set)
+        self.valid_emoji_names = frozenset(emoji_set)
 
-    async def _allow_reaction(self, message: Message, reaction: Reaction, member: Member) -> bool:
+    def _allow_payload(self, payload: RawReactionActionEvent) -> bool:
+        return discord_emoji_to_emoji_name(payload.emoji) in self.valid_emoji_names
+
+    def _allow_reaction_sync(self, message: Message, reaction: Reaction, member: Member) -> bool:
         valid_emoji_reaction = discord_emoji_to_emoji_name(reaction.emoji) in self.valid_emoji_names
         return valid_emoji_reaction
 
-    async def _allow_reaction_raw(self, message: Message, reaction: RawReactionActionEvent) -> bool:
+    def _allow_reaction_raw_sync(self, message: Message, reaction: RawReactionActionEvent) -> bool:
         valid_emoji_reaction = discord_emoji_to_emoji_name(reaction.emoji) in self.valid_emoji_names
         return valid_emoji_reaction
 
@@ -55,56 +164,78 @@ class BotAuthoredMessageReactionFilter(ReactionFilter):
     """
     This prevents the bot from reacting to messages it didn't post.
     """
+    cost = 1
 
     def __init__(self, bot_id: int, filters: Optional[ReactionFilter] = None):
         super().__init__(filters)
         self.bot_id = bot_id
 
-    async def _allow_reaction(self, message: Message, reaction: Reaction, member: Member):
+    def _allow_reaction_sync(self, message: Message, reaction: Reaction, member: Member):
         return message.author.id == self.bot_id
 
-    async def _allow_reaction_raw(self, message: Message, reaction: RawReactionActionEvent):
+    def _allow_reaction_raw_sync(self, message: Message, reaction: RawReactionActionEvent):
         return message.author.id == self.bot_id
 
 
 class NotPosterEmojiReactionFilter(ReactionFilter):
     """
     This prevents the bot from reacting to its own emojis in DM.
+    If the poster's id is given, the bot's own reactions are also rejected before fetching the message.
     """
+    cost = 1
+
+    def __init__(self, reaction_filter: Optional[ReactionFilter] = None, *, poster_id: Optional[int] = None):
+        super().__init__(reaction_filter)
+        self.poster_id = poster_id
 
-    async def _allow_reaction(self, message: Message, reaction: Reaction, member: Member):
+    def _allow_payload(self, payload: RawReactionActionEvent) -> bool:
+        return self.poster_id is None or payload.user_id != self.poster_id
+
+    def _allow_reaction_sync(self, message: Message, reaction: Reaction, member: Member):
         return message.author.id != member.id
 
-    async def _allow_reaction_raw(self, message: Message, reaction: RawReactionActionEvent) -> bool:
+    def _allow_reaction_raw_sync(self, message: Message, reaction: RawReactionActionEvent) -> bool:
         if not reaction.guild_id:
             return message.author.id != reaction.user_id
         return True
 
 
 class MessageOwnerReactionFilter(ReactionFilter):
+    cost = 1
+
     def __init__(self, original_author_id: int, filters: Optional[ReactionFilter] = None):
         super().__init__(filters)
         self.original_author_id = original_author_id
 
-    async def _allow_reaction(self, message: Message, reaction: Reaction, member: Member) -> bool:
+    def _allow_payload(self, payload: RawReactionActionEvent) -> bool:
+        return not payload.guild_id or payload.user_id == self.original_author_id
+
+    def _allow_reaction_sync(self, message: Message, reaction: Reaction, member: Member) -> bool:
         return member.id == self.original_author_id
 
-    async def _allow_reaction_raw(self, message: Message, reaction: RawReactionActionEvent) -> bool:
+    def _allow_reaction_raw_sync(self, message: Message, reaction: RawReactionActionEvent) -> bool:
         if reaction.guild_id:
             return reaction.member.id == self.original_author_id
         return True
 
 
 class FriendReactionFilter(ReactionFilter):
+    cost = 2
+
     def __init__(self, original_author_id: int, friends_ids: List[int], filters: Optional[ReactionFilter] = None):
         super().__init__(filters)
         self.original_author_id = original_author_id
         self.friend_ids = friends_ids
 
-    async def _allow_reaction(self, message: Message, reaction: Reaction, member: Member) -> bool:
+    def _allow_payload(self, payload: RawReactionActionEvent) -> bool:
+        return not payload.guild_id or payload.user_id in self.friend_ids
+
+    def _allow_reaction_sync(self, message: Message, reaction: Reaction, member: Member) -> bool:
         # return await friend_ids(self.original_author_id, member.id)
         return member.id in self.friend_ids
 
-    async def _allow_reaction_raw(self, message: Message, reaction: RawReactionActionEvent) -> bool:
+    def _allow_reaction_raw_sync(self, message: Message, reaction: RawReactionActionEvent) -> bool:
         # return self.friend_ids(self.original_author_id, reaction.member.id)
-        return reaction.member.id in self.friend_ids
+        if reaction.guild_id:
+            return reaction.member.id in self.friend_ids
+        return True
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Union
+
+from discord import Emoji, Message, NotFound
+
+logger = logging.getLogger('discordmenu.reaction_queue')
+
+ADD_REACTION = 'add'
+CLEAR_REACTION = 'clear'
+
+
+class _ReactionOp:
+    __slots__ = ('action', 'emoji', 'key', 'enqueued_at')
+
+    def __init__(self, action: str, emoji: Union[str, Emoji]):
+        self.action = action
+        self.emoji = emoji
+        self.key = str(emoji)
+        self.enqueued_at = time.monotonic()
+
+
+class _PendingReactions:
+    def __init__(self, message: Message):
+        self.message = message
+        self.ops: Deque[_ReactionOp] = deque()
+        self.waiters: List[asyncio.Future] = []
+
+
+class ReactionQueue:
+    """
+    Runs reaction adds and clears one at a time per channel, since Discord rate limits reaction endpoints per
+    channel anyway. Pending operations for a message are coalesced: an add followed by a clear of the same emoji
+    cancels out, and repeated operations are dropped. Scheduling a new emoji diff for a message supersedes
+    whatever is still pending from the previous one, and a deleted message drops all of its work.
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, _PendingReactions] = {}
+        # message ids with pending work, per channel, served round robin
+        self._channels: Dict[int, "OrderedDict[int, None]"] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def depth(self) -> int:
+        return sum(len(p.ops) for p in self._pending.values())
+
+    def schedule(self, message: Message, add: Iterable[Union[str, Emoji]] = (),
+                 remove: Iterable[Union[str, Emoji]] = (), supersede: bool = True,
+                 remove_first: bool = False) -> asyncio.Future:
+        """
+        Queue reactions to add and clear on a message, returning a future that completes once the message
+        has no more pending work. Emoji diffs should supersede, one-off reactions should not. Adds are queued
+        first so buttons show up quickly, unless `remove_first`, e.g. to clear and add reactions again in order.
+        """
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(message.id)
+        if pending is None:
+            pending = self._pending[message.id] = _PendingReactions(message)
+        else:
+            pending.message = message
+            if supersede:
+                self.dropped += len(pending.ops)
+                pending.ops.clear()
+
+        ops = [_ReactionOp(ADD_REACTION, emoji) for emoji in add]
+        clears = [_ReactionOp(CLEAR_REACTION, emoji) for emoji in remove]
+        for op in clears + ops if remove_first else ops + clears:
+            self._enqueue(pending, op)
+
+        waiter = loop.create_future()
+        if not pending.ops:
+            self._finish(message.id, pending)
+            waiter.set_result(None)
+            return waiter
+        pending.waiters.append(waiter)
+
+        channel_id = message.channel.id
+        self._channels.setdefault(channel_id, OrderedDict())[message.id] = None
+        if channel_id not in self._workers:
+            self._workers[channel_id] = loop.create_task(self._run_channel(channel_id))
+        return waiter
+
+    def drop(self, message_id: int) -> None:
+        """Forget all pending work for a message, e.g. because it was deleted."""
+        pending = self._pending.get(message_id)
+        if pending is not None:
+            self.dropped += len(pending.ops)
+            pending.ops.clear()
+            self._finish(message_id, pending)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'depth': self.depth,
+            'messages': len(self._pending),
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'average_latency': self.total_latency / self.executed if self.executed else 0.0,
+            'max_latency': self.max_latency,
+        }
+
+    def _enqueue(self, pending: _PendingReactions, op: _ReactionOp) -> None:
+        for queued in pending.ops:
+            if queued.key != op.key:
+                continue
+            if queued.action == op.action:
+                self.coalesced += 1
+                return
+            if queued.action == ADD_REACTION:
+                # the reaction was never added, so there is nothing to clear
+                pending.ops.remove(queued)
+                self.coalesced += 2
+                return
+        pending.ops.append(op)
+
+    def _finish(self, message_id: int, pending: _PendingReactions, error: BaseException = None) -> None:
+        if self._pending.get(message_id) is pending:
+            del self._pending[message_id]
+        channel = self._channels.get(pending.message.channel.id)
+        if channel is not None:
+            channel.pop(message_id, None)
+        for waiter in pending.waiters:
+            if waiter.done():
+                continue
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
+        pending.waiters.clear()
+
+    async def _run_channel(self, channel_id: int) -> None:
+        channel = self._channels[channel_id]
+        try:
+            while channel:
+                message_id = next(iter(channel))
+                pending = self._pending.get(message_id)
+                if pending is None or not pending.ops:
+                    channel.pop(message_id, None)
+                    if pending is not None:
+                        self._finish(message_id, pending)
+                    continue
+
+                op = pending.ops.popleft()
+                try:
+                    await self._execute(pending.message, op)
+                except NotFound:
+                    # the message was deleted early
+                    self.drop(message_id)
+                    continue
+                except Exception as e:
+                    self.dropped += len(pending.ops)
+                    pending.ops.clear()
+                    self._finish(message_id, pending, e)
+                    continue
+
+                latency = time.monotonic() - op.enqueued_at
+                self.executed += 1
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+
+                if not pending.ops:
+                    self._finish(message_id, pending)
+                elif message_id in channel:
+                    channel.move_to_end(message_id)
+        finally:
+            del self._workers[channel_id]
+            if not channel:
+                self._channels.pop(channel_id, None)
+
+    @staticmethod
+    async def _execute(message: Message, op: _ReactionOp) -> None:
+        if op.action == ADD_REACTION:
+            await message.add_reaction(op.emoji)
+        else:
+            await message.clear_reaction(op.emoji)
+            # discord.py doesn't update the message object, which may be cached for later emoji diffs
+            message.reactions[:] = [r for r in message.reactions if str(r.emoji) != op.key]
+
+
+reaction_queue = ReactionQueue()
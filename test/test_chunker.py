@@ -0,0 +1,105 @@
+import timeit
+
+import pytest
+
+from discordmenu.embed.components import EmbedMain, EmbedField, ChunkOverflow
+from discordmenu.embed.view import EmbedView, EmbedChunkError, FIELD_VALUE_LIMIT, MAX_FIELDS, EMBED_TOTAL_LIMIT, \
+    HIDDEN_CHAR, ELLIPSIS, DROPPED_TRUNCATED, DROPPED_FIELD_LIMIT, DROPPED_LENGTH_LIMIT
+
+
+def lines(count, width=50):
+    return '\n'.join(str(i).rjust(width, '.') for i in range(count))
+
+
+def embed_of(*fields, title='title'):
+    view = EmbedView(EmbedMain(title=title), embed_fields=list(fields))
+    return view, view.to_embed()
+
+
+def test_long_fields_are_split_at_the_delimiter():
+    markdown = lines(60)
+    view, embed = embed_of(EmbedField('name', markdown, continuation_title='more'))
+    assert len(embed.fields) > 1
+    assert all(len(f.value) <= FIELD_VALUE_LIMIT for f in embed.fields)
+    assert '\n'.join(f.value for f in embed.fields) == markdown
+    assert [f.name for f in embed.fields] == ['name'] + ['more'] * (len(embed.fields) - 1)
+    assert view.dropped_content == []
+
+
+def test_continuations_are_untitled_by_default():
+    _, embed = embed_of(EmbedField('name', lines(60)))
+    assert embed.fields[1].name == HIDDEN_CHAR
+
+
+def test_a_line_that_fits_exactly_is_one_field():
+    _, embed = embed_of(EmbedField('name', 'x' * FIELD_VALUE_LIMIT))
+    assert [f.value for f in embed.fields] == ['x' * FIELD_VALUE_LIMIT]
+
+
+def test_a_line_longer_than_a_field_is_an_error_by_default():
+    with pytest.raises(EmbedChunkError):
+        embed_of(EmbedField('name', 'x' * (FIELD_VALUE_LIMIT + 1)))
+
+
+@pytest.mark.parametrize('overflow', [ChunkOverflow.HARD_WRAP, ChunkOverflow.WORD_WRAP])
+def test_wrapped_lines_keep_all_their_text(overflow):
+    markdown = ' '.join(['word'] * 600)
+    _, embed = embed_of(EmbedField('name', markdown, overflow=overflow))
+    assert all(len(f.value) <= FIELD_VALUE_LIMIT for f in embed.fields)
+    joiner = '' if overflow == ChunkOverflow.HARD_WRAP else ' '
+    assert joiner.join(f.value for f in embed.fields) == markdown
+
+
+def test_truncated_lines_are_recorded():
+    long_line = 'x' * (FIELD_VALUE_LIMIT + 100)
+    view, embed = embed_of(EmbedField('name', long_line + '\nnext', overflow=ChunkOverflow.TRUNCATE))
+    assert embed.fields[0].value == long_line[:FIELD_VALUE_LIMIT - len(ELLIPSIS)] + ELLIPSIS
+    assert embed.fields[1].value == 'next'
+    [dropped] = view.dropped_content
+    assert dropped.reason == DROPPED_TRUNCATED
+    assert dropped.text == long_line[FIELD_VALUE_LIMIT - len(ELLIPSIS):]
+
+
+def test_fields_past_the_field_limit_are_dropped():
+    view, embed = embed_of(*[EmbedField(str(i), 'body') for i in range(MAX_FIELDS + 3)])
+    assert len(embed.fields) == MAX_FIELDS
+    assert [d.reason for d in view.dropped_content] == [DROPPED_FIELD_LIMIT] * 3
+    assert [d.field_name for d in view.dropped_content] == [str(MAX_FIELDS + i) for i in range(3)]
+
+
+def test_the_embed_stays_within_the_total_limit():
+    fields = [EmbedField(str(i), lines(19), continuation_title=str(i)) for i in range(8)]
+    view, embed = embed_of(*fields, title='t' * 200)
+    assert len(embed) <= EMBED_TOTAL_LIMIT
+    assert view.dropped_content
+    assert all(d.reason == DROPPED_LENGTH_LIMIT for d in view.dropped_content)
+    # the first field that didn't fit is cut after its last chunk that did
+    first_dropped = view.dropped_content[0]
+    kept = [f.value for f in embed.fields if f.name == first_dropped.field_name]
+    assert '\n'.join(kept + [first_dropped.text]) == lines(19)
+
+
+def chunk_time(line_count):
+    view = EmbedView(EmbedMain(title='title'), embed_fields=[EmbedField('name', lines(line_count))])
+    return min(timeit.repeat(lambda: view._chunk_embed_fields(FIELD_VALUE_LIMIT, max_fields=line_count),
+                             number=3, repeat=3)) / 3
+
+
+def test_chunking_time_is_linear():
+    # run with -s to see the numbers; ten times the text should take about ten times as long, where rebuilding
+    # the remaining text after every chunk would take a hundred times as long
+    small, large = chunk_time(4000), chunk_time(40000)
+    print('\n200 KB: {:.2f}ms, 2 MB: {:.2f}ms'.format(small * 1e3, large * 1e3))
+    assert large < 30 * small
+
+
+def embed_time(line_count):
+    view = EmbedView(EmbedMain(title='title'), embed_fields=[EmbedField('name', lines(line_count))])
+    return min(timeit.repeat(view.to_embed, number=3, repeat=3)) / 3
+
+
+def test_to_embed_stops_after_the_chunks_that_fit():
+    # run with -s to see the numbers; only what fits in the embed is chunked, whatever the size of the field
+    small, large = embed_time(200), embed_time(40000)
+    print('\n10 KB: {:.2f}ms, 2 MB: {:.2f}ms'.format(small * 1e3, large * 1e3))
+    assert large < 10 * small
@@ -0,0 +1,132 @@
+import asyncio
+
+from discordmenu.embed.components import EmbedMain
+from discordmenu.embed.menu import EmbedMenu
+from discordmenu.embed.view import EmbedView
+from discordmenu.menu.footer import embed_footer_with_state
+from discordmenu.menu.listener.menu_listener import MenuListener, _Click
+from discordmenu.menu.listener.menu_map import MenuMap, MenuMapEntry
+from discordmenu.menu.tabbed_menu import TabbedMenu, TabbedMenuTransitions, TabbedViews, TabbedViewState, keycap
+
+
+def tab_view(title):
+    def view(state):
+        return EmbedView(EmbedMain(title=title), embed_footer=embed_footer_with_state(state))
+    return view
+
+
+TabbedViews.set('folding', [tab_view('one'), tab_view('two'), tab_view('three')])
+
+
+class FakeChannel:
+    id = 1
+
+
+class FakeMessage:
+    _next_id = 1000
+
+    def __init__(self, embed):
+        FakeMessage._next_id += 1
+        self.id = FakeMessage._next_id
+        self.channel = FakeChannel()
+        self.guild = None
+        self.content = None
+        self.edited_at = None
+        self.embeds = [embed]
+        self.reactions = []
+        self.edits = []
+
+    async def edit(self, **changes):
+        # give queued clicks a chance to arrive while the edit is in flight
+        await asyncio.sleep(0.01)
+        self.edits.append(changes)
+        if 'embed' in changes:
+            self.embeds = [changes['embed']]
+        return self
+
+    async def add_reaction(self, emoji):
+        pass
+
+
+class FakeBot:
+    cached_messages = []
+
+
+async def initial_message():
+    wrapper = await TabbedMenu.embed_page(TabbedViewState(0, '', 'folding', 0))
+    return FakeMessage(wrapper.embed_view.to_embed()), wrapper.extract_ims()
+
+
+def test_folded_clicks_edit_once():
+    async def run():
+        message, ims = await initial_message()
+        menu = TabbedMenu.menu()
+        new_control = await menu.transition_folded(message, ims, [(keycap(2), None), (keycap(3), None)])
+        assert new_control.extract_ims()['current_index'] == 2
+        assert len(message.edits) == 1
+        assert message.edits[0]['embed'].title == 'three'
+
+    asyncio.run(run())
+
+
+def test_listener_folds_clicks_queued_behind_a_transition():
+    async def run():
+        message, ims = await initial_message()
+        listener = MenuListener(FakeBot(), MenuMap({
+            TabbedMenu.MENU_TYPE: MenuMapEntry(TabbedMenu, TabbedMenuTransitions),
+        }))
+        first = asyncio.ensure_future(listener._run_click(message, _Click(keycap(2), None, ims, {})))
+        await asyncio.sleep(0)
+        for n in (3, 1, 3):
+            await listener._run_click(message, _Click(keycap(n), None, ims, {}))
+        await first
+
+        # the first click runs alone, the three queued behind it are applied with one edit
+        assert [e['embed'].title for e in message.edits] == ['two', 'three']
+        assert not listener._pending_clicks
+
+    asyncio.run(run())
+
+
+def test_a_transition_renders_its_view_once(monkeypatch):
+    renders = []
+    to_embed = EmbedView.to_embed
+    monkeypatch.setattr(EmbedView, 'to_embed', lambda self: renders.append(self) or to_embed(self))
+
+    async def run():
+        message, ims = await initial_message()
+        listener = MenuListener(FakeBot(), MenuMap({
+            TabbedMenu.MENU_TYPE: MenuMapEntry(TabbedMenu, TabbedMenuTransitions),
+        }))
+        renders.clear()
+        await listener._run_click(message, _Click(keycap(2), None, ims, {}))
+        assert len(renders) == 1
+
+    asyncio.run(run())
+
+
+def test_clicks_queued_behind_a_failed_transition_still_run(monkeypatch, caplog):
+    transition = EmbedMenu.transition
+
+    async def fail_on_two(self, message, ims, emoji_clicked, member, **data):
+        if emoji_clicked == keycap(2):
+            await asyncio.sleep(0.01)
+            raise RuntimeError('broken view')
+        return await transition(self, message, ims, emoji_clicked, member, **data)
+    monkeypatch.setattr(EmbedMenu, 'transition', fail_on_two)
+
+    async def run():
+        message, ims = await initial_message()
+        listener = MenuListener(FakeBot(), MenuMap({
+            TabbedMenu.MENU_TYPE: MenuMapEntry(TabbedMenu, TabbedMenuTransitions),
+        }))
+        first = asyncio.ensure_future(listener._run_click(message, _Click(keycap(2), None, ims, {})))
+        await asyncio.sleep(0)
+        await listener._run_click(message, _Click(keycap(3), None, ims, {}))
+        await first
+
+        assert [e['embed'].title for e in message.edits] == ['three']
+        assert not listener._pending_clicks
+
+    asyncio.run(run())
+    assert 'broken view' in caplog.text
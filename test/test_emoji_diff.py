@@ -0,0 +1,79 @@
+import timeit
+
+from discordmenu.discord_client import diff_emojis_raw
+from discordmenu.emoji.emoji_diff import diff_emoji_refs
+
+
+def test_adds_and_removes():
+    diff = diff_emoji_refs(['a', 'b', 'c'], ['a', 'c', 'd'])
+    assert diff.add == ['d']
+    assert diff.remove == ['b']
+    assert diff.order_preserved
+
+
+def test_add_keeps_button_order():
+    diff = diff_emoji_refs([], ['c', 'a', 'b'])
+    assert diff.add == ['c', 'a', 'b']
+    assert diff.remove == []
+
+
+def test_duplicates_are_ignored():
+    diff = diff_emoji_refs(['a', 'a'], ['a', 'b', 'b', None])
+    assert diff.add == ['b']
+    assert diff.remove == []
+
+
+def test_fallback_ref_keeps_any_matching_reaction():
+    diff = diff_emoji_refs(['x2'], [('x1', 'x2'), ['y1', 'y2']])
+    assert diff.add == [('y1', 'y2')]
+    assert diff.remove == []
+
+
+def test_button_added_in_the_middle_breaks_order():
+    diff = diff_emoji_refs(['a', 'b'], ['a', 'x', 'b'])
+    assert diff.add == ['x']
+    assert not diff.order_preserved
+
+
+def test_swapped_buttons_break_order():
+    assert not diff_emoji_refs(['a', 'b'], ['b', 'a']).order_preserved
+
+
+def test_reorder_clears_and_adds_everything():
+    diff = diff_emoji_refs(['a', 'b', 'c'], ['a', 'x', 'b'], reorder=True)
+    assert diff.remove == ['a', 'b', 'c']
+    assert diff.add == ['a', 'x', 'b']
+    assert not diff.order_preserved
+
+
+def test_reorder_is_incremental_when_order_is_kept():
+    diff = diff_emoji_refs(['a', 'b'], ['a', 'b', 'x'], reorder=True)
+    assert diff.remove == []
+    assert diff.add == ['x']
+
+
+def test_many_buttons():
+    current = ['e{}'.format(i) for i in range(25)]
+    next_emojis = current[5:] + ['n{}'.format(i) for i in range(5)]
+    diff = diff_emoji_refs(current, next_emojis)
+    assert diff.remove == current[:5]
+    assert diff.add == next_emojis[20:]
+    assert diff.order_preserved
+
+
+def test_diff_emojis_raw_reports_order():
+    assert diff_emojis_raw(['a', 'b'], ['b', 'a']) == {'add': [], 'remove': [], 'order_preserved': False}
+
+
+def diff_time(n):
+    current = ['e{}'.format(i) for i in range(n)]
+    next_emojis = current[n // 5:] + [('n{}'.format(i), 'f{}'.format(i)) for i in range(n // 5)]
+    return min(timeit.repeat(lambda: diff_emoji_refs(current, next_emojis), number=5, repeat=3)) / 5
+
+
+def test_diff_time_is_linear():
+    # run with -s to see the numbers; ten times the emojis should take about ten times as long, where a
+    # quadratic diff would take a hundred times as long
+    small, large = diff_time(500), diff_time(5000)
+    print('\n500 emojis: {:.0f}us, 5000 emojis: {:.0f}us'.format(small * 1e6, large * 1e6))
+    assert large < 30 * small
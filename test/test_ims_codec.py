@@ -0,0 +1,105 @@
+import base64
+import json
+import timeit
+
+import pytest
+
+from discordmenu.ims_codec import encode_state, decode_state, ImsCodecError, IMS_CODECS, JsonImsCodec, \
+    CompactImsCodec, COMPRESSED_FLAG
+from discordmenu.intra_message_state import IntraMessageState
+from discordmenu.menu.scrollable_menu import ScrollableViewState
+from discordmenu.menu.simple_tabbed_text_menu import SimpleTabbedTextViewState
+from discordmenu.menu.tabbed_menu import TabbedViewState
+
+STATE = {
+    'menu_type': 'ScrollableMenu',
+    'original_author_id': 123456789012345678,
+    'raw_query': 'tëst query',
+    'current_pane_num': 3,
+    'negative': -70000,
+    'ratio': 0.25,
+    'flags': [True, False, None],
+    'nested': {'a': [1, 2, {'b': 'c'}]},
+}
+
+
+@pytest.mark.parametrize('codec_id', [JsonImsCodec.codec_id, CompactImsCodec.codec_id])
+def test_round_trip(codec_id):
+    codec = IMS_CODECS[codec_id]
+    assert decode_state(encode_state(STATE, codec)) == STATE
+    assert decode_state(encode_state(STATE, codec, compress_threshold=None)) == STATE
+
+
+def test_compact_matches_json_for_tuples_and_non_str_keys():
+    value = {'t': (1, 2), 1: 'one', None: 'none'}
+    assert decode_state(encode_state(value)) == json.loads(json.dumps(value))
+
+
+def test_large_states_are_compressed():
+    state = {'messages': ['the same line again'] * 50}
+    data = encode_state(state)
+    header = base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))[0]
+    assert header & COMPRESSED_FLAG
+    assert decode_state(data) == state
+
+
+def test_encoded_states_are_url_safe():
+    data = encode_state({'q': '?&=/+ ' * 30})
+    assert all(c.isalnum() or c in '-_' for c in data)
+
+
+def test_legacy_json_states_still_decode():
+    legacy = base64.b64encode(json.dumps(STATE).encode()).decode()
+    assert decode_state(legacy) == STATE
+
+
+def test_unknown_codec_is_an_error():
+    data = base64.urlsafe_b64encode(bytes([0x0E]) + b'x').decode()
+    with pytest.raises(ImsCodecError):
+        decode_state(data)
+
+
+def test_round_trip_through_an_embed_url():
+    url = IntraMessageState.serialize('https://example.com/icon.png?size=64', STATE, 'imsf', use_store=False)
+    assert 'size=64' in url
+    assert IntraMessageState.deserialize(url, 'imsf') == STATE
+
+
+def menu_states():
+    return {
+        'tabbed': TabbedViewState(123456789012345678, 'some query', 'monster', 2,
+                                  extra_state={'resolved_monster_id': 4012}).serialize(),
+        'scrollable': ScrollableViewState(123456789012345678, 'a longer query', 'search', 3, 4, 12,
+                                          extra_state={'ids': list(range(4000, 4020)), 'page_size': 10}).serialize(),
+        'simple_tabbed_text': SimpleTabbedTextViewState(
+            ['Tab {}: some text that the menu shows on this tab'.format(i) for i in range(9)], 4).serialize(),
+    }
+
+
+def legacy_encode(state):
+    return base64.b64encode(json.dumps(state).encode()).decode()
+
+
+def legacy_decode(data):
+    return json.loads(base64.b64decode(data))
+
+
+def mean_time(fn, number=200):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+
+@pytest.mark.parametrize('name', sorted(menu_states()))
+def test_benchmark_against_json(name):
+    # run with -s to see the numbers
+    state = menu_states()[name]
+    legacy, encoded = legacy_encode(state), encode_state(state)
+    legacy_time = mean_time(lambda: legacy_decode(legacy_encode(state)))
+    codec_time = mean_time(lambda: decode_state(encode_state(state)))
+    print('\n{}: {} -> {} characters, round trip {:.1f}us -> {:.1f}us'.format(
+        name, len(legacy), len(encoded), legacy_time * 1e6, codec_time * 1e6))
+
+    assert decode_state(encoded) == legacy_decode(legacy)
+    assert len(encoded) < 0.8 * len(legacy)
+    # the compact codec is pure python, so it is slower than the C json module, but it has to stay cheap
+    # next to the rest of a transition
+    assert codec_time < max(20 * legacy_time, 0.001)
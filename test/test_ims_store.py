@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from discord import Embed
+
+from discordmenu.ims_store import SqliteImsStore, MemoryImsStore, ImsStateNotFound
+from discordmenu.intra_message_state import IntraMessageState
+
+STATE = {'menu_type': 'ScrollableMenu', 'raw_query': 'x' * 200}
+
+
+def test_sqlite_store_evicts_only_beyond_max_size_after_replacing():
+    async def run():
+        store = SqliteImsStore(':memory:', max_size=3)
+        for key in ('a', 'b', 'a', 'a', 'c'):
+            await store.put(key, key.encode())
+        assert [await store.get(k) for k in ('a', 'b', 'c')] == [b'a', b'b', b'c']
+
+        await store.put('d', b'd')
+        # b is now the least recently written
+        assert await store.get('b') is None
+        assert [await store.get(k) for k in ('a', 'c', 'd')] == [b'a', b'c', b'd']
+        store.close()
+
+    asyncio.run(run())
+
+
+def embed_with_state():
+    url = IntraMessageState.serialize('https://example.com/icon.png', STATE)
+    return Embed().set_footer(text='footer', icon_url=url)
+
+
+def test_extract_data_returns_a_placeholder_for_stored_states():
+    async def run():
+        store = MemoryImsStore()
+        IntraMessageState.set_store(store)
+        try:
+            embed = embed_with_state()
+            ims = IntraMessageState.extract_data(embed)
+            assert IntraMessageState.is_stored(ims)
+            assert await IntraMessageState.resolve(ims) == STATE
+            assert await IntraMessageState.load(embed) == STATE
+
+            await IntraMessageState._flush_pending_writes()
+            store._data.clear()
+            with pytest.raises(ImsStateNotFound):
+                await IntraMessageState.load(embed)
+        finally:
+            IntraMessageState.set_store(None)
+            IntraMessageState._pending_writes.clear()
+
+    asyncio.run(run())
+
+
+def test_inline_states_are_not_placeholders():
+    ims = IntraMessageState.extract_data(embed_with_state())
+    assert not IntraMessageState.is_stored(ims)
+    assert ims == STATE
@@ -0,0 +1,86 @@
+import timeit
+
+from discordmenu.embed.base import Box
+from discordmenu.embed.components import EmbedField
+from discordmenu.embed.text import Text, BoldText, LabeledText
+
+
+def test_values_that_are_not_strings_are_written_with_str():
+    assert Text(5).to_markdown() == '5'
+    assert Text(None).to_markdown() == ''
+    assert BoldText(5).to_markdown() == '**5**'
+    assert Box(Text(1.5), 'a').to_markdown() == '1.5\na'
+    assert EmbedField(5, 'body')['name'] == '5'
+
+
+def test_a_change_renders_only_the_boxes_containing_it_again():
+    changed = Text('old')
+    unchanged = LabeledText('name', 'value')
+    view = Box(Box(changed, BoldText('bold')), unchanged)
+    assert view.to_markdown() == 'old\n**bold**\n**name** value'
+    unchanged_markdown = unchanged._markdown
+
+    changed.value = 'new'
+    assert view.to_markdown() == 'new\n**bold**\n**name** value'
+    assert unchanged._markdown is unchanged_markdown
+
+
+def test_a_changed_box_is_noticed_through_any_box_containing_it():
+    shared = Text('old')
+    first, second = Box(shared, 'first'), Box(shared, 'second')
+    assert first.to_markdown() == 'old\nfirst'
+    assert second.to_markdown() == 'old\nsecond'
+
+    shared.value = 'new'
+    assert second.to_markdown() == 'new\nsecond'
+    assert first.to_markdown() == 'new\nfirst'
+
+
+def test_a_limited_render_stops_writing():
+    box = Box(*['line {}'.format(i) for i in range(100)])
+    assert box.to_markdown(limit=12) == 'line 0\nline '
+    assert box.to_markdown() == '\n'.join('line {}'.format(i) for i in range(100))
+    assert box.to_markdown(limit=12) == 'line 0\nline '
+
+
+def test_subclasses_can_still_extend_to_markdown():
+    class Shouting(Text):
+        def to_markdown(self, limit=None):
+            return super().to_markdown(limit).upper()
+
+    box = Box(Shouting('hey'), 'you')
+    assert box.to_markdown() == 'HEY\nyou'
+    assert box.to_markdown() == 'HEY\nyou'
+
+
+def tree(depth, width):
+    if depth == 0:
+        return Box(*[LabeledText('name {}'.format(i), 'value {}'.format(i)) for i in range(width)])
+    return Box(*[tree(depth - 1, width) for _ in range(width)])
+
+
+def first_text(box):
+    while not isinstance(box, LabeledText):
+        box = box._inner_object[0]
+    return box.value
+
+
+def test_repeat_renders_reuse_the_cache():
+    # run with -s to see the numbers; an unchanged tree isn't rendered again, and after a change only the boxes
+    # above it are, though every cached box is still checked once
+    trees = [tree(3, 6) for _ in range(3)]
+    first = min(timeit.repeat(lambda: trees.pop().to_markdown(), number=1, repeat=3))
+    view = tree(3, 6)
+    view.to_markdown()
+    repeat = min(timeit.repeat(view.to_markdown, number=1, repeat=3))
+    text = first_text(view)
+    changes = iter(range(10))
+
+    def change_one_leaf():
+        text.value = 'changed {}'.format(next(changes))
+        return view.to_markdown()
+    changed = min(timeit.repeat(change_one_leaf, number=1, repeat=3))
+    print('\nfirst render: {:.2f}ms, repeat: {:.1f}us, after one change: {:.2f}ms'.format(
+        first * 1e3, repeat * 1e6, changed * 1e3))
+    assert repeat < first / 20
+    assert changed < first / 1.5
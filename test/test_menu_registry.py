@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+
+from discordmenu.discord_client import send_embed, forget_message
+from discordmenu.embed.components import EmbedMain
+from discordmenu.embed.view import EmbedView
+from discordmenu.embed.wrapper import EmbedWrapper
+from discordmenu.menu.listener.menu_listener import MenuListener
+from discordmenu.menu_registry import MenuRegistry, menu_registry
+
+
+class FakeMessage:
+    def __init__(self, message_id, embed):
+        self.id = message_id
+        self.content = None
+        self.guild = None
+        self.edited_at = None
+        self.channel = SimpleNamespace(id=1)
+        self.embeds = [embed]
+        self.reactions = []
+
+    async def add_reaction(self, emoji):
+        pass
+
+
+class FakeContext:
+    async def send(self, embed):
+        return FakeMessage(4242, embed)
+
+
+def test_a_listener_registry_records_sent_menus():
+    registry = MenuRegistry()
+    MenuListener(SimpleNamespace(), menu_registry=registry)
+
+    async def run():
+        return await send_embed(FakeContext(), EmbedWrapper(EmbedView(EmbedMain(title='menu')), []))
+
+    message = asyncio.run(run())
+    assert message.id in registry
+    assert message.id in menu_registry
+
+    forget_message(message.id)
+    assert message.id not in registry
+    assert message.id not in menu_registry
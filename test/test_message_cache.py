@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from discord import PartialEmoji
+
+from discordmenu.menu.listener.message_cache import MessageCache
+
+BOT_ID = 1
+
+
+def reaction_event(event_type, user_id, name='\N{BLACK RIGHT-POINTING TRIANGLE}'):
+    return SimpleNamespace(event_type=event_type, message_id=10, user_id=user_id, emoji=PartialEmoji(name=name))
+
+
+def test_reaction_events_update_the_cached_message():
+    cache = MessageCache()
+    message = SimpleNamespace(id=10, author=SimpleNamespace(id=BOT_ID), reactions=[])
+    cache.put(message)
+
+    cache.apply_reaction_event(reaction_event('REACTION_ADD', BOT_ID))
+    cache.apply_reaction_event(reaction_event('REACTION_ADD', 2))
+    [reaction] = message.reactions
+    assert (reaction.count, reaction.me) == (2, True)
+
+    cache.apply_reaction_event(reaction_event('REACTION_REMOVE', BOT_ID))
+    assert (reaction.count, reaction.me) == (1, False)
+    cache.apply_reaction_event(reaction_event('REACTION_REMOVE', 2))
+    assert message.reactions == []
+
+    # removing a reaction the cache never saw is ignored
+    cache.apply_reaction_event(reaction_event('REACTION_REMOVE', 2))
+    assert message.reactions == []
@@ -0,0 +1,71 @@
+import asyncio
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from types import MappingProxyType
+
+from discordmenu.embed.components import EmbedMain
+from discordmenu.embed.offload import offloadable, view_offloader
+from discordmenu.embed.view import EmbedView
+from discordmenu.ims_store import MemoryImsStore
+from discordmenu.intra_message_state import IntraMessageState, ImsView
+from discordmenu.menu.footer import embed_footer_with_state
+from discordmenu.menu.scrollable_menu import ScrollableMenu, ScrollableViews, ScrollableViewState
+
+
+@offloadable
+def page_view(state):
+    return EmbedView(EmbedMain(title='page {}'.format(state.current_pane_num)),
+                     embed_footer=embed_footer_with_state(state))
+
+
+ScrollableViews.set('offloaded', [page_view] * 3)
+
+
+def shared_ims():
+    ims = ScrollableViewState(1, 'query', 'offloaded', 0, 0, 3).serialize()
+    # as the listener passes it to transitions: a view over the state shared with the IMS cache
+    return ImsView(MappingProxyType(ims))
+
+
+def scroll_right_with(executor):
+    async def run():
+        view_offloader.configure(executor)
+        try:
+            return await ScrollableMenu.respond_to_right(None, shared_ims())
+        finally:
+            view_offloader.configure(None)
+
+    with executor:
+        return asyncio.run(run())
+
+
+def test_ims_views_pickle_as_dicts():
+    ims = shared_ims()
+    ims['extra'] = [1]
+    assert pickle.loads(pickle.dumps(ims)) == dict(ims)
+
+
+def test_a_transition_is_built_in_a_worker_process():
+    wrapper = scroll_right_with(ProcessPoolExecutor(1))
+    assert wrapper.embed_view.to_embed().title == 'page 1'
+    ims = wrapper.extract_ims()
+    assert ims['current_pane_num'] == 1
+    assert ims['raw_query'] == 'query'
+    assert view_offloader.offloaded > 0
+
+
+def test_workers_never_use_the_ims_store(monkeypatch):
+    stored_on = []
+    store_state = IntraMessageState._store_state
+    monkeypatch.setattr(IntraMessageState, '_store_state',
+                        staticmethod(lambda data: stored_on.append(threading.current_thread()) or store_state(data)))
+    IntraMessageState.set_store(MemoryImsStore())
+    try:
+        wrapper = scroll_right_with(ThreadPoolExecutor(1))
+        wrapper.embed_view.to_embed()
+    finally:
+        IntraMessageState.set_store(None)
+        IntraMessageState._pending_writes.clear()
+    assert stored_on
+    assert all(thread is threading.main_thread() for thread in stored_on)
@@ -0,0 +1,86 @@
+import asyncio
+
+from discordmenu.embed.components import EmbedMain
+from discordmenu.embed.paginator import EmbedPaginator
+from discordmenu.embed.view import EmbedView
+from discordmenu.menu.footer import embed_footer_with_state
+from discordmenu.menu.page_provider import PageProviderRegistry
+from discordmenu.menu.scrollable_menu import ScrollableMenu, ScrollableViews, ScrollableViewState
+from discordmenu.menu.tabbed_menu import TabbedViews
+
+
+class FlakyProvider:
+    def __init__(self, pages):
+        self.pages = pages
+        self.fail = True
+
+    async def get_page(self, state, index):
+        if self.fail:
+            raise RuntimeError('page {} failed'.format(index))
+        return EmbedView(EmbedMain(title=self.pages[index]))
+
+    async def page_count(self, state):
+        return len(self.pages)
+
+
+class EmptyProvider:
+    async def get_page(self, state, index):
+        raise IndexError(index)
+
+    async def page_count(self, state):
+        return 0
+
+
+def scroll_state(menu_id, pane_num=0, num_pages=3):
+    return ScrollableViewState(1, '', menu_id, 0, pane_num, num_pages)
+
+
+def test_a_failed_prefetch_is_built_again():
+    async def run():
+        registry = PageProviderRegistry()
+        provider = FlakyProvider(['zero', 'one', 'two'])
+        registry.register('flaky', provider, prefetch=1)
+        state = scroll_state('flaky')
+        registry.prefetch('flaky', 0, 3, lambda i: state)
+        await asyncio.sleep(0)
+        provider.fail = False
+
+        view = await registry.get_page('flaky', state, 1)
+        assert view.embed_main.title == 'one'
+        assert registry.stats()['prefetch_hits'] == 0
+        assert registry.stats()['prefetch_misses'] == 1
+
+    asyncio.run(run())
+
+
+def test_scrolling_a_menu_without_pages_does_nothing():
+    async def run():
+        ScrollableViews.register('empty', EmptyProvider())
+        assert await ScrollableMenu.respond_to_right(None, scroll_state('empty').serialize()) is None
+        assert await ScrollableMenu.respond_to_left(None, scroll_state('empty').serialize()) is None
+
+    asyncio.run(run())
+
+
+def test_a_paginated_page_without_a_state_has_no_footer():
+    paginator = EmbedPaginator(EmbedView(EmbedMain(description='text')), footer=embed_footer_with_state)
+    assert paginator.page(0).embed_footer is None
+    assert paginator.page(0, scroll_state('paginated')).embed_footer is not None
+
+
+def test_data_still_maps_menu_ids_to_their_views():
+    views = [lambda state: EmbedView(EmbedMain(title='one'))]
+    ScrollableViews.DATA['data shim'] = views
+    assert ScrollableViews.DATA['data shim'] is views
+    assert ScrollableViews.view_count('data shim') == 1
+    views.append(lambda state: EmbedView(EmbedMain(title='two')))
+    assert ScrollableViews.view_count('data shim') == 2
+
+    ScrollableViews.register('data shim provider', EmptyProvider())
+    assert 'data shim' in ScrollableViews.DATA
+    assert 'data shim provider' not in ScrollableViews.DATA
+    assert 'data shim' not in TabbedViews.DATA
+
+    del ScrollableViews.DATA['data shim']
+    assert 'data shim' not in ScrollableViews.PROVIDERS
+    ScrollableViews.discard('data shim provider')
@@ -0,0 +1,142 @@
+import asyncio
+from types import SimpleNamespace
+
+from discordmenu.menu.listener.menu_listener import MenuListener
+from discordmenu.menu.listener.menu_map import MenuMap, MenuMapEntry, REACTION_PIPELINE_CACHE_SIZE
+from discordmenu.menu.listener.reaction_filter_list import ReactionFilterList
+from discordmenu.menu.tabbed_menu import TabbedMenu, TabbedMenuTransitions, keycap
+from discordmenu.reaction_filter import ReactionFilter, ReactionFilterPipeline, ValidEmojiReactionFilter, \
+    NotPosterEmojiReactionFilter, MessageOwnerReactionFilter, FriendReactionFilter
+
+BOT_ID = 1
+OWNER_ID = 2
+
+
+class RecordingFilter(ReactionFilter):
+    def __init__(self, name, allow, calls, cost=10):
+        super().__init__()
+        self.name = name
+        self.allow = allow
+        self.calls = calls
+        self.cost = cost
+
+    def _allow_reaction_raw_sync(self, message, reaction):
+        self.calls.append(self.name)
+        return self.allow
+
+
+class AsyncRecordingFilter(RecordingFilter):
+    async def _allow_reaction_raw(self, message, reaction):
+        self.calls.append(self.name)
+        return self.allow
+
+
+def payload(user_id, emoji=keycap(1), guild_id=None):
+    return SimpleNamespace(user_id=user_id, emoji=emoji, guild_id=guild_id, member=None)
+
+
+def message(author_id=BOT_ID):
+    return SimpleNamespace(author=SimpleNamespace(id=author_id))
+
+
+def test_sync_filters_run_first_cheapest_first():
+    calls = []
+    pipeline = ReactionFilterPipeline([
+        AsyncRecordingFilter('async', True, calls, cost=1),
+        RecordingFilter('expensive', True, calls, cost=5),
+        RecordingFilter('cheap', True, calls, cost=1),
+    ])
+    assert asyncio.run(pipeline.allow_reaction_raw(message(), payload(OWNER_ID)))
+    assert calls == ['cheap', 'expensive', 'async']
+
+
+class PublicOverrideFilter(ReactionFilter):
+    async def allow_reaction(self, message, reaction, member):
+        return False
+
+    async def allow_reaction_raw(self, message, reaction):
+        return False
+
+
+def test_filters_overriding_the_public_checks_are_run():
+    pipeline = ReactionFilterPipeline([PublicOverrideFilter()])
+    assert not asyncio.run(pipeline.allow_reaction_raw(message(), payload(OWNER_ID)))
+    assert not asyncio.run(pipeline.allow_reaction(message(), payload(OWNER_ID), SimpleNamespace(id=OWNER_ID)))
+    assert not NotPosterEmojiReactionFilter(PublicOverrideFilter()).is_sync
+
+
+def test_first_rejection_short_circuits():
+    calls = []
+    pipeline = ReactionFilterPipeline([
+        RecordingFilter('rejects', False, calls, cost=1),
+        RecordingFilter('sync', True, calls, cost=2),
+        AsyncRecordingFilter('async', True, calls),
+    ])
+    assert not asyncio.run(pipeline.allow_reaction_raw(message(), payload(OWNER_ID)))
+    assert calls == ['rejects']
+
+
+def test_nested_filters_are_an_or():
+    calls = []
+    either = RecordingFilter('first', False, calls, cost=1)
+    either.inner_filter = RecordingFilter('second', True, calls)
+    pipeline = ReactionFilterPipeline([either])
+    assert asyncio.run(pipeline.allow_reaction_raw(message(), payload(OWNER_ID)))
+    assert calls == ['first', 'second']
+
+
+def test_payload_checks():
+    pipeline = ReactionFilterPipeline([
+        ValidEmojiReactionFilter([keycap(1)]),
+        NotPosterEmojiReactionFilter(poster_id=BOT_ID),
+        MessageOwnerReactionFilter(OWNER_ID, FriendReactionFilter(OWNER_ID, [3])),
+    ])
+    assert pipeline.allow_payload(payload(OWNER_ID, guild_id=5))
+    assert pipeline.allow_payload(payload(3, guild_id=5))
+    assert not pipeline.allow_payload(payload(4, guild_id=5))
+    assert not pipeline.allow_payload(payload(BOT_ID, guild_id=5))
+    assert not pipeline.allow_payload(payload(OWNER_ID, emoji='not a button', guild_id=5))
+    # in DMs the owner filters leave the decision to the raw checks, as those do
+    assert pipeline.allow_payload(payload(4))
+    assert not pipeline.allow_payload(payload(BOT_ID))
+
+
+def test_extending_with_nothing_keeps_the_pipeline():
+    pipeline = ReactionFilterPipeline([NotPosterEmojiReactionFilter()])
+    assert pipeline.extend([]) is pipeline
+    assert len(pipeline.extend([NotPosterEmojiReactionFilter()])) == 2
+
+
+def test_listener_pipelines_are_built_once_per_filter_set():
+    owner_filter = MessageOwnerReactionFilter(OWNER_ID)
+    listener = MenuListener(SimpleNamespace(user=SimpleNamespace(id=BOT_ID)), MenuMap({
+        TabbedMenu.MENU_TYPE: MenuMapEntry(TabbedMenu, TabbedMenuTransitions),
+    }), reaction_filters=ReactionFilterList([owner_filter]))
+    entry = listener.menu_map[TabbedMenu.MENU_TYPE]
+
+    pipeline = entry.reaction_pipeline(BOT_ID, listener._reaction_filters_key)
+    assert entry.reaction_pipeline(BOT_ID, listener._reaction_filters_key) is pipeline
+    assert owner_filter in pipeline
+    payload_pipeline = listener._get_payload_pipeline()
+    assert listener._get_payload_pipeline() is payload_pipeline
+
+    listener.reaction_filters = ReactionFilterList()
+    assert listener._get_payload_pipeline() is not payload_pipeline
+    assert owner_filter not in entry.reaction_pipeline(BOT_ID, listener._reaction_filters_key)
+
+
+def test_entries_keep_a_bounded_number_of_pipelines():
+    entry = MenuMapEntry(TabbedMenu, TabbedMenuTransitions)
+    first_key = (MessageOwnerReactionFilter(OWNER_ID),)
+    first = entry.reaction_pipeline(BOT_ID, first_key)
+    for _ in range(REACTION_PIPELINE_CACHE_SIZE * 2):
+        entry.reaction_pipeline(BOT_ID, (MessageOwnerReactionFilter(OWNER_ID),))
+        # recently used pipelines are kept
+        assert entry.reaction_pipeline(BOT_ID, first_key) is first
+    assert len(entry._reaction_pipelines) == REACTION_PIPELINE_CACHE_SIZE
+
+
+def test_not_poster_filter_still_takes_a_nested_filter():
+    inner = MessageOwnerReactionFilter(OWNER_ID)
+    assert NotPosterEmojiReactionFilter(inner).inner_filter is inner
+    assert NotPosterEmojiReactionFilter(reaction_filter=inner, poster_id=BOT_ID).poster_id == BOT_ID
@@ -0,0 +1,19 @@
+from datetime import datetime, timezone
+
+from discord import Embed
+
+from discordmenu.embed.snapshot import EmbedSnapshot
+
+
+def test_a_changed_timestamp_is_a_change():
+    before = EmbedSnapshot.of(Embed(title='title', timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc)))
+    after = EmbedSnapshot.of(Embed(title='title', timestamp=datetime(2024, 1, 2, tzinfo=timezone.utc)))
+    assert after.changes(before) == {'timestamp'}
+    assert after != before
+    assert EmbedSnapshot.of(Embed(title='title')).changes(before) == {'timestamp'}
+
+
+def test_a_timestamp_sent_back_by_discord_is_unchanged():
+    sent = Embed(title='title', timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc))
+    received = Embed.from_dict({'title': 'title', 'timestamp': '2024-01-01T00:00:00.000000+00:00'})
+    assert EmbedSnapshot.of(received) == EmbedSnapshot.of(sent)